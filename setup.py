@@ -28,6 +28,9 @@ setup(
         'Future',
         'Six',
     ],
+    extras_require={
+        'msgpack': ['msgpack'],
+    },
     entry_points='''
         [console_scripts]
         ipbb=ipbb.scripts.builder:main
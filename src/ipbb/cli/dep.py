@@ -5,6 +5,8 @@ from __future__ import print_function, absolute_import
 # Modules
 import click
 
+from ..tools.hashing import kAlgorithms as kHashAlgorithms
+
 
 # ------------------------------------------------------------------------------
 @click.group()
@@ -59,9 +61,116 @@ def components(env, output):
 @click.pass_obj
 @click.option('-o', '--output', default=None, help="Destination of the command output. Default: stdout")
 @click.option('-v', '--verbose', count=True)
-def hash(env, output, verbose):
+@click.option('-j', '--jobs', type=int, default=None, help="Number of files hashed in parallel. Default: number of cores, up to 8")
+@click.option('-c', '--chunk-size', 'chunksize', type=int, default=0x10000, help="Read size, in bytes. Default: 65536")
+@click.option('--verify', is_flag=True, help="Hash all files, ignoring the digest cache, and warn about outdated cache entries.")
+@click.option('-m', '--manifest', default=None, help="Write the hash tree to file, as JSON.")
+@click.option('--compare', default=None, type=click.Path(exists=True), help="List the subtrees that changed with respect to a previous manifest.")
+@click.option(
+    '--mmap-threshold',
+    'mmapthreshold',
+    type=int,
+    default=0x1000000,
+    help="Size, in bytes, from which files are hashed from a memory map, 0 to disable. Default: 16 MiB",
+)
+@click.option('-x', '--ignore', multiple=True, help="Glob pattern of files and folders to skip when hashing folders, e.g. '*.log'. Can be repeated.")
+@click.option('-a', '--algo', type=click.Choice(kHashAlgorithms), default='sha1', help="Hashing algorithm, recorded in the manifest. Default: sha1")
+@click.option('--benchmark', is_flag=True, help="Measure the throughput of each algorithm on the project files, instead of hashing.")
+def hash(env, output, verbose, jobs, chunksize, verify, manifest, compare, mmapthreshold, ignore, algo, benchmark):
+    '''Hash the project source files
+
+    Digests form a Merkle tree: file, component, package, command group and
+    project digests, each level hashing the names and digests of the level
+    below, in dep order.
+
+    Folders, e.g. iprepo entries, are hashed as subtrees of the files they
+    contain, visited in name order.
+
+    Files are read and hashed on a pool of threads. File digests are cached
+    in the work area (var/), and reused as long as the file inode, size and
+    modification time are unchanged.
+    '''
     from ..cmds.dep import hash
-    hash(env, output, verbose)
+    hash(env, output, verbose, jobs, chunksize, verify, manifest, compare, mmapthreshold, ignore, algo, benchmark)
+
+
+# ------------------------------------------------------------------------------
+@dep.command('export', short_help="Export the resolved dependency graph")
+@click.option('-f', '--format', 'fmt', type=click.Choice(['json', 'jsonl', 'msgpack']), default='json', help="Output format. Default: json")
+@click.option('-o', '--output', default=None, help="Destination of the command output. Default: stdout")
+@click.pass_obj
+def export(env, fmt, output):
+    '''Export the resolved dependency graph of the current project
+
+    Commands by group, with flags and libraries, the dep file include tree,
+    variables, missing dependencies and the reverse dependency map are
+    written in a single streaming pass.
+
+    \b
+    - json: one object, with a list of records per section
+    - jsonl: one record per line, record type in the 'type' field
+    - msgpack: sequence of maps, as in jsonl (requires the msgpack module)
+    '''
+    from ..cmds.dep import export
+    export(env, fmt, output)
+
+
+# ------------------------------------------------------------------------------
+@dep.command('impact', short_help="List the project areas affected by changes to files")
+@click.argument('paths', nargs=-1, required=True, type=click.Path())
+@click.option('-l', '--projects-only', 'projectsonly', is_flag=True, help="Print the names of the affected project areas only.")
+@click.option('-o', '--output', default=None, help="Destination of the command output. Default: stdout")
+@click.pass_obj
+def impact(env, paths, projectsonly, output):
+    '''List the project areas, dep files and components affected by changes to PATHS
+
+    Changed sources, dep files and files added to globbed directories are
+    matched against the dependency trees of all the project areas, as cached
+    in each of them. Areas whose sources changed since their last parse are
+    parsed again (incrementally) and their cache updated.
+    '''
+    from ..cmds.dep import impact
+    impact(env, paths, projectsonly, output)
+
+
+# ------------------------------------------------------------------------------
+@dep.command('batch', short_help="Resolve the dependencies of several project areas at once")
+@click.argument('projs', nargs=-1)
+@click.option('-f', '--force', is_flag=True, help="Ignore the dependency caches and parse all project areas from scratch.")
+@click.option('-o', '--output', default=None, help="Destination of the command output. Default: stdout")
+@click.pass_obj
+def batch(env, projs, force, output):
+    '''Resolve the dependency trees of the PROJS project areas (default: all) in one go
+
+    Dep file parsing and the subtrees common to several projects are shared
+    between them. The result is stored in each project area cache, and a
+    summary printed per project.
+    '''
+    from ..cmds.dep import batch
+    batch(env, projs, force, output)
+
+
+# ------------------------------------------------------------------------------
+@dep.command('profile', short_help="Profile the dependency tree parsing")
+@click.option('-n', '--top', type=int, default=20, help="Number of dep files to display. Default: 20")
+@click.option(
+    '-s',
+    '--sort',
+    'sortby',
+    type=click.Choice(['time', 'total', 'lines', 'globTime', 'evalTime', 'parsed']),
+    default='time',
+    help="Sorting criterion. Default: time",
+)
+@click.option('-j', '--json', 'jsonfile', default=None, help="Dump all the profiling data, as JSON, to file.")
+@click.pass_obj
+def profile(env, top, sortby, jsonfile):
+    '''Parse the current project dependency tree, reporting the cost of each dep file
+
+    Times are wall times. 'time' excludes the dep files included, 'total'
+    includes them. The project dependency cache is neither used nor updated.
+    '''
+    from ..cmds.dep import profile
+    profile(env, top, sortby, jsonfile)
 
 
 # ------------------------------------------------------------------------------
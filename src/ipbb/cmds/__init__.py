@@ -9,9 +9,11 @@ from . import utils
 from os import walk, getcwd
 from os.path import join, split, exists, splitext, basename, dirname
 from ..depparser.Pathmaker import Pathmaker
+from ..depparser.FileSystemIndex import FileSystemIndex
 from ..depparser.DepFileParser import DepFileParser
+from ..depparser.DepFileCache import DepFileCache
 
-from ..defaults import kWorkAreaFile, kProjAreaFile, kProjUserFile, kSourceDir, kProjDir
+from ..defaults import kWorkAreaFile, kProjAreaFile, kProjUserFile, kProjDepCacheFile, kSourceDir, kProjDir
 
 
 # ------------------------------------------------------------------------------
@@ -148,7 +150,7 @@ class Environment(object):
             return
 
         self.work.path, self.work.cfgFile = lWorkAreaPath, kWorkAreaFile
-        self.pathMaker = Pathmaker(self.srcdir, self._verbosity)
+        self.pathMaker = Pathmaker(self.srcdir, self._verbosity, FileSystemIndex(self.srcdir))
         # -----------------------------
 
         # -----------------------------
@@ -178,23 +180,55 @@ class Environment(object):
     @property
     def depParser(self):
         if self._depParser is None:
+            self._depParser = self.makeDepParser(self.currentproj)
 
-            self._depParser = DepFileParser(
-                self.currentproj.settings['toolset'],
-                self.pathMaker,
-                aVerbosity=self._verbosity,
-            )
+        return self._depParser
 
-            try:
-                self._depParser.parse(
-                    self.currentproj.settings['topPkg'],
-                    self.currentproj.settings['topCmp'],
-                    self.currentproj.settings['topDep'],
-                )
-            except OSError as e:
-                pass
+    # -----------------------------------------------------------------------------
+    def makeDepParser(self, aProjInfo, aMemo=None, aUseCache=True):
+        '''Resolves the dependency tree of a project area
+
+        The result is cached in the project area and reused as long as none of
+        the dep files and source directories it depends upon have changed.
+        Outdated results are updated incrementally.
+
+        Args:
+            aProjInfo (obj:`ProjectInfo`): project area
+            aMemo (obj:`ParseMemo`): parse results shared with other projects
+            aUseCache (bool): if False, parse from scratch and overwrite the cache
+        '''
+
+        lParser = DepFileParser(
+            aProjInfo.settings['toolset'],
+            self.pathMaker,
+            aVerbosity=self._verbosity,
+            aMemo=aMemo,
+        )
 
-        return self._depParser
+        lCache = DepFileCache(
+            join(aProjInfo.path, kProjDepCacheFile),
+            lParser,
+            aProjInfo.settings['topPkg'],
+            aProjInfo.settings['topCmp'],
+            aProjInfo.settings['topDep'],
+        )
+
+        if aUseCache and lCache.restore():
+            return lParser
+
+        try:
+            lParser.parse(
+                aProjInfo.settings['topPkg'],
+                aProjInfo.settings['topCmp'],
+                aProjInfo.settings['topDep'],
+                aPrevious=lCache.previous if aUseCache else None,
+            )
+        except OSError as e:
+            pass
+        else:
+            lCache.store()
+
+        return lParser
 
     # -----------------------------------------------------------------------------
     @property
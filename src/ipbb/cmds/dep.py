@@ -25,15 +25,27 @@ from os.path import (
     isdir,
 )
 from ..tools.common import which, SmartOpen
+from ..tools.hashing import kChunkSize, kMmapThreshold, kAlgorithms, defaultWorkers, expandPaths, iterHashes, FileHashCache, HashTree
+from ..defaults import kVarDir, kHashCacheFile
 from .utils import DirSentry, printDictTable
 from click import echo, secho, style, confirm
 from texttable import Texttable
 
 
+# ------------------------------------------------------------------------------
+# Subcommands operating on all the project areas of the work area
+kWorkAreaSubcommands = ('impact', 'batch')
+
+
 # ------------------------------------------------------------------------------
 def dep(env, proj):
     '''Dependencies command group'''
 
+    if click.get_current_context().invoked_subcommand in kWorkAreaSubcommands:
+        if env.work.path is None:
+            raise click.ClickException('Work area root directory not found')
+        return
+
     lProj = proj if proj is not None else env.currentproj.name
     if lProj is not None:
         # Change directory before executing subcommand
@@ -228,6 +240,165 @@ def components(env, output):
             lWriter()
 
 
+# ------------------------------------------------------------------------------
+def export(env, fmt, output):
+    '''Export the resolved dependency graph of the current project'''
+    from ..depparser.DepGraphExporter import DepGraphExporter
+
+    if fmt == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            raise click.ClickException("msgpack export requires the 'msgpack' python module")
+
+    lExporter = DepGraphExporter(env.depParser)
+
+    # msgpack is a binary format
+    lBinary = (fmt == 'msgpack')
+    if output is None:
+        lStream = getattr(sys.stdout, 'buffer', sys.stdout) if lBinary else sys.stdout
+        lExporter.write(lStream, fmt)
+        lStream.flush()
+    else:
+        with open(output, 'wb' if lBinary else 'w') as lStream:
+            lExporter.write(lStream, fmt)
+
+
+# ------------------------------------------------------------------------------
+def impact(env, paths, projectsonly, output):
+    '''List the project areas, dep files and components affected by changes to files'''
+    from . import ProjectInfo
+
+    lPaths = [abspath(p) for p in paths]
+
+    # Dependency trees are restored from the project caches, projects are
+    # only parsed again if their sources changed since the last parse
+    lImpacts = collections.OrderedDict()
+    for lProj in sorted(env.projects):
+        # A broken project does not prevent answering for the others
+        try:
+            lParser = env.makeDepParser(ProjectInfo(join(env.projdir, lProj)))
+        except (SystemExit, OSError, RuntimeError) as lExc:
+            secho('Failed to resolve the dependencies of project {}: {}'.format(lProj, lExc), fg='red', err=True)
+            continue
+
+        for lPath in lPaths:
+            for lDependant in lParser.dependants(lPath):
+                lImpacts.setdefault(lProj, []).append((lPath, ) + lDependant)
+
+    with SmartOpen(output) as lWriter:
+        if projectsonly:
+            for lProj in lImpacts:
+                lWriter(lProj)
+            return
+
+        if not lImpacts:
+            return
+
+        lTable = Texttable(max_width=0)
+        lTable.header(['project', 'path', 'dep file', 'package', 'component'])
+        lTable.set_deco(Texttable.HEADER | Texttable.BORDER)
+        lTable.set_chars(['-', '|', '+', '-'])
+        for lProj, lRows in iteritems(lImpacts):
+            for lPath, lDepFile, lPkg, lCmp in lRows:
+                lTable.add_row([lProj, relpath(lPath, env.srcdir), relpath(lDepFile, env.srcdir), lPkg, lCmp])
+        lWriter(lTable.draw())
+
+
+# ------------------------------------------------------------------------------
+def batch(env, projs, force, output):
+    '''Resolve the dependency trees of several project areas in one go'''
+    import time
+    from . import ProjectInfo
+    from ..depparser.DepFileParser import ParseMemo
+
+    lAvailable = env.projects
+    lProjs = projs if projs else sorted(lAvailable)
+    lUnknown = [p for p in lProjs if p not in lAvailable]
+    if lUnknown:
+        raise click.ClickException('Project area(s) not found: {}'.format(', '.join(lUnknown)))
+
+    # Dep file lines, filesystem signatures and resolved subtrees are shared by all projects
+    lMemo = ParseMemo()
+    lKinds = ['setup', 'src', 'addrtab', 'iprepo']
+
+    lTable = Texttable(max_width=0)
+    lTable.header(['project'] + lKinds + ['missing', 'time (s)'])
+    lTable.set_deco(Texttable.HEADER | Texttable.BORDER)
+    lTable.set_chars(['-', '|', '+', '-'])
+    lTable.set_cols_dtype(['t'] * (len(lKinds) + 2) + ['f'])
+    lTable.set_precision(3)
+
+    lFailed = collections.OrderedDict()
+    for lProj in lProjs:
+        lStart = time.time()
+        try:
+            lParser = env.makeDepParser(ProjectInfo(join(env.projdir, lProj)), aMemo=lMemo, aUseCache=not force)
+        except (SystemExit, OSError, RuntimeError) as lExc:
+            lFailed[lProj] = str(lExc)
+            lTable.add_row([lProj] + ['error'] * (len(lKinds) + 1) + [time.time() - lStart])
+            continue
+
+        lTable.add_row(
+            [lProj]
+            + [len(lParser.commands[k]) for k in lKinds]
+            + [len(lParser.missing), time.time() - lStart]
+        )
+
+    with SmartOpen(output) as lWriter:
+        lWriter(lTable.draw())
+
+    if lFailed:
+        for lProj, lError in iteritems(lFailed):
+            secho('{}: {}'.format(lProj, lError), fg='red', err=True)
+        raise click.ClickException('Failed to resolve the dependencies of {} project(s): {}'.format(len(lFailed), ', '.join(lFailed)))
+
+
+# ------------------------------------------------------------------------------
+def profile(env, top, sortby, jsonfile):
+    '''Profile the parsing of the current project's dependency tree'''
+    import json
+    from ..depparser.DepFileParser import DepFileParser
+    from ..depparser.DepFileProfiler import DepFileProfiler
+
+    lSettings = env.currentproj.settings
+    lProfiler = DepFileProfiler()
+    lParser = DepFileParser(lSettings['toolset'], env.pathMaker, aVerbosity=env._verbosity, aProfiler=lProfiler)
+
+    # Always parse from scratch, the project cache is left untouched
+    lStart = lProfiler.clock()
+    try:
+        lParser.parse(lSettings['topPkg'], lSettings['topCmp'], lSettings['topDep'])
+    except OSError:
+        pass
+    lTotal = lProfiler.clock() - lStart
+
+    lProfiles = lProfiler.sorted(sortby)
+
+    if jsonfile:
+        with SmartOpen(jsonfile) as lWriter:
+            lWriter(json.dumps(collections.OrderedDict([
+                ('project', env.currentproj.name),
+                ('time', lTotal),
+                ('depfiles', [p.toDict() for p in lProfiles]),
+            ]), indent=2))
+
+    lTable = Texttable(max_width=0)
+    lTable.header(['dep file', 'depth', 'parsed', 'reused', 'lines', 'time (ms)', 'total (ms)', 'globs', 'glob (ms)', 'evals', 'eval (ms)'])
+    lTable.set_deco(Texttable.HEADER | Texttable.BORDER)
+    lTable.set_chars(['-', '|', '+', '-'])
+    lTable.set_cols_dtype(['t', 'i', 'i', 'i', 'i', 'f', 'f', 'i', 'f', 'i', 'f'])
+    lTable.set_precision(1)
+    for p in lProfiles[:top]:
+        lTable.add_row([
+            relpath(p.path, env.srcdir), p.depth, p.parsed, p.reused, p.lines,
+            p.time * 1e3, p.total * 1e3, p.globs, p.globTime * 1e3, p.evals, p.evalTime * 1e3
+        ])
+
+    echo('Parsed {} dep files in {:.1f} ms, top {} by {}:'.format(len(lProfiles), lTotal * 1e3, min(top, len(lProfiles)), sortby))
+    echo(lTable.draw())
+
+
 # ------------------------------------------------------------------------------
 
 
@@ -282,41 +453,89 @@ def hashAndUpdate0g(
 # ----------------------------
 
 
-# ----------------------------
-def hashAndUpdate(aPath, aChunkSize=0x10000, aUpdateHashes=None, aAlgo=hashlib.sha1):
-
-    # New instance of the selected algorithm
-    lHash = aAlgo()
-
-    if isfile(aPath):
-        # Loop ovet the file content
-        with open(aPath, "rb") as f:
-            for lChunk in iter(lambda: f.read(aChunkSize), b''):
-                lHash.update(lChunk)
-
-                # Also update other hashes
-                for lUpHash in aUpdateHashes:
-                    lUpHash.update(lChunk)
-    elif isdir(aPath):
-        for root, dirs, files in os.walk(aPath):
-            for f in files:
-                hashAndUpdate(f, aChunkSize, aUpdateHashes=aUpdateHashes, aAlgo=aAlgo)
-
-    return lHash
-
+def hash(
+    env, output, verbose, jobs=None, chunksize=kChunkSize, verify=False, manifest=None, compare=None,
+    mmapthreshold=kMmapThreshold, ignore=(), algo='sha1', benchmark=False
+):
+    '''Hash the project files
 
-# ----------------------------
+    Digests form a Merkle tree: files, components, packages, command groups
+    and project, each level hashing the names and digests of the level below.
 
+    Returns:
+        HashTree: the project hash tree
+    '''
+    import json
 
-def hash(env, output, verbose):
+    if benchmark:
+        return hashBenchmark(env, output, jobs, chunksize, mmapthreshold, ignore)
 
-    lAlgoName = 'sha1'
+    lAlgoName = algo
 
     lAlgo = getattr(hashlib, lAlgoName, None)
 
     # Ensure that the selecte algorithm exists
     if lAlgo is None:
-        raise AttributeError('Hashing algorithm {0} is not available'.format(lAlgoName))
+        raise click.ClickException('Hashing algorithm {0} is not available'.format(lAlgoName))
+
+    lPrevious = None
+    if compare:
+        with open(compare) as f:
+            lManifest = json.load(f)
+        # Digests are only comparable if computed with the same algorithm
+        if lManifest['algorithm'] != lAlgoName:
+            raise click.ClickException(
+                "Manifest {} was computed with {}, not {}. Use '--algo {}' to compare against it.".format(
+                    compare, lManifest['algorithm'], lAlgoName, lManifest['algorithm']
+                )
+            )
+        lPrevious = HashTree.fromDict(lManifest['tree'], lAlgo)
+
+    lWorkers = jobs if jobs is not None else defaultWorkers()
+
+    # Digests of unchanged files are reused from the work area cache
+    lCache = FileHashCache(join(env.work.path, kVarDir, kHashCacheFile)) if env.work.path is not None else None
+
+    lCmdsByGrp = env.depParser.commands
+
+    # Folders (e.g. iprepo entries) are expanded into the files they contain
+    lExpanded = iter(expandPaths(
+        [lCmd.FilePath for lCmds in itervalues(lCmdsByGrp) for lCmd in lCmds], ignore, lWorkers
+    ))
+    lTree = HashTree(env.currentproj.name, lAlgo)
+    lFiles = []
+    for lGrp, lCmds in iteritems(lCmdsByGrp):
+        # Empty groups and folders are part of the tree too
+        lTree.node(lGrp)
+        for lCmd in lCmds:
+            lNodePath = (lGrp, lCmd.Package, lCmd.Component, relpath(lCmd.FilePath, env.srcdir))
+            lTree.node(*lNodePath)
+            lFiles += [(lNodePath + ((lSubPath,) if lSubPath else ()), lPath) for lSubPath, lPath in next(lExpanded)]
+
+    lStale = []
+    lHashes = iterHashes(
+        [lPath for _, lPath in lFiles],
+        aChunkSize=chunksize, aAlgo=lAlgo, aWorkers=lWorkers, aCache=lCache, aVerify=verify,
+        aMmapThreshold=mmapthreshold if mmapthreshold > 0 else None
+    )
+    for (lNodePath, _), (lPath, lDigest, lStaleDigest) in zip(lFiles, lHashes):
+        lTree.node(*lNodePath).setDigest(lDigest)
+        if lStaleDigest is not None:
+            lStale.append(lPath)
+
+    if lCache is not None:
+        lCache.store()
+
+    for lPath in lStale:
+        secho('Warning: cached digest of {} did not match its content'.format(lPath), fg='yellow', err=True)
+
+    if manifest:
+        with SmartOpen(manifest) as lWriter:
+            lWriter(json.dumps(collections.OrderedDict([
+                ('project', env.currentproj.name),
+                ('algorithm', lAlgoName),
+                ('tree', lTree.toDict()),
+            ]), indent=2))
 
     with SmartOpen(output) as lWriter:
 
@@ -329,43 +548,95 @@ def hash(env, output, verbose):
             lWriter("# " + "=" * len(lTitle))
             lWriter()
 
-        lProjHash = lAlgo()
-        lGrpHashes = collections.OrderedDict()
-        for lGrp, lCmds in iteritems(env.depParser.commands):
-            lGrpHash = lAlgo()
-            if verbose:
+            for lGrp, lGrpNode in iteritems(lTree.children):
                 lWriter("#" + "-" * 79)
                 lWriter("# " + lGrp)
                 lWriter("#" + "-" * 79)
-            for lCmd in lCmds:
-                lCmdHash = hashAndUpdate(
-                    lCmd.FilePath, aUpdateHashes=[lProjHash, lGrpHash], aAlgo=lAlgo
-                ).hexdigest()
-                if verbose:
-                    lWriter(lCmdHash, lCmd.FilePath)
-
-            lGrpHashes[lGrp] = lGrpHash
+                for lPath, lNode in lGrpNode.walk():
+                    if len(lPath) >= 3 and lNode.leaf:
+                        lWriter(lNode.hexdigest(), join(env.srcdir, *lPath[2:]))
+                lWriter()
 
-            if verbose:
+            for lTitle, lDepth in [('Per component hashes', 2), ('Per package hashes', 1)]:
+                lWriter("#" + "-" * 79)
+                lWriter("# " + lTitle)
+                lWriter("#" + "-" * 79)
+                for lGrpNode in itervalues(lTree.children):
+                    for lPath, lNode in lGrpNode.walk(lDepth):
+                        if len(lPath) == lDepth:
+                            lWriter(lNode.hexdigest(), lGrpNode.name, ':'.join(lPath))
                 lWriter()
 
-        if verbose:
             lWriter("#" + "-" * 79)
             lWriter("# Per cmd-group hashes")
             lWriter("#" + "-" * 79)
-            for lGrp, lHash in iteritems(lGrpHashes):
-                lWriter(lHash.hexdigest(), lGrp)
+            for lGrp, lNode in iteritems(lTree.children):
+                lWriter(lNode.hexdigest(), lGrp)
             lWriter()
 
             lWriter("#" + "-" * 79)
             lWriter("# Global hash for project '" + env.currentproj.name + "'")
             lWriter("#" + "-" * 79)
-            lWriter(lProjHash.hexdigest(), env.currentproj.name)
+            lWriter(lTree.hexdigest(), env.currentproj.name)
 
         if not verbose:
-            lWriter(lProjHash.hexdigest())
+            lWriter(lTree.hexdigest())
 
-    return lProjHash
+        if lPrevious is not None:
+            lChanges = list(lTree.diff(lPrevious))
+            if verbose:
+                lWriter()
+                lWriter("#" + "-" * 79)
+                lWriter("# Changes with respect to " + compare)
+                lWriter("#" + "-" * 79)
+            for lPath, lStatus in lChanges:
+                lWriter(lStatus, ' '.join(lPath) if lPath else env.currentproj.name)
+
+    return lTree
+
+
+# ------------------------------------------------------------------------------
+def hashBenchmark(env, output, jobs=None, chunksize=kChunkSize, mmapthreshold=kMmapThreshold, ignore=(), algos=kAlgorithms):
+    '''Measures the hashing throughput of the project files, for each algorithm'''
+    import time
+
+    lWorkers = jobs if jobs is not None else defaultWorkers()
+    lMmapThreshold = mmapthreshold if mmapthreshold > 0 else None
+
+    lFiles = [
+        lPath
+        for lPaths in expandPaths([lCmd.FilePath for lCmds in itervalues(env.depParser.commands) for lCmd in lCmds], ignore, lWorkers)
+        for _, lPath in lPaths
+        if isfile(lPath)
+    ]
+    lSize = sum(os.path.getsize(p) for p in lFiles)
+
+    # Read all files once, so that all algorithms run on a warm page cache
+    for _ in iterHashes(lFiles, chunksize, hashlib.md5, lWorkers, aMmapThreshold=lMmapThreshold):
+        pass
+
+    lResults = []
+    for lAlgoName in algos:
+        lAlgo = getattr(hashlib, lAlgoName)
+        lStart = time.time()
+        for _ in iterHashes(lFiles, chunksize, lAlgo, lWorkers, aMmapThreshold=lMmapThreshold):
+            pass
+        lElapsed = time.time() - lStart
+        lResults.append((lAlgoName, lAlgo().digest_size * 8, lElapsed, lSize / lElapsed / 1e6 if lElapsed else float('inf')))
+
+    lTable = Texttable(max_width=0)
+    lTable.header(['algorithm', 'bits', 'time (s)', 'MB/s'])
+    lTable.set_deco(Texttable.HEADER | Texttable.BORDER)
+    lTable.set_chars(['-', '|', '+', '-'])
+    lTable.set_cols_dtype(['t', 'i', 'f', 'f'])
+    lTable.set_precision(3)
+    for lRow in sorted(lResults, key=lambda r: r[3], reverse=True):
+        lTable.add_row(lRow)
+
+    with SmartOpen(output) as lWriter:
+        lWriter('{} files, {:.1f} MB, {} threads'.format(len(lFiles), lSize / 1e6, lWorkers))
+        lWriter(lTable.draw())
+    return lResults
 
 
 # ------------------------------------------------------------------------------
@@ -12,6 +12,7 @@ from ..defaults import kProjAreaFile, kProjDir
 from . import ProjectInfo
 from .utils import DirSentry, raiseError, validateComponent
 from ..depparser.Pathmaker import Pathmaker
+from ..depparser.FileSystemIndex import FileSystemIndex
 
 from os.path import join, split, exists, splitext, relpath, isdir
 from click import echo, style, secho
@@ -43,7 +44,7 @@ def create(env, kind, projname, component, topdep):
 
     # ------------------------------------------------------------------------------
 
-    lPathmaker = Pathmaker(env.srcdir, 0)
+    lPathmaker = Pathmaker(env.srcdir, 0, FileSystemIndex(env.srcdir))
     lTopPackage, lTopComponent = component
 
     if lTopPackage not in env.sources:
@@ -56,7 +57,7 @@ def create(env, kind, projname, component, topdep):
         # raise click.ClickException('Top-level package %s not found' % lTopPackage)
 
     lTopComponentPath = lPathmaker.getPath(lTopPackage, lTopComponent)
-    if not exists(lTopComponentPath):
+    if not lPathmaker.exists(lTopComponentPath):
         secho(
             "Top-level component '{}:{}'' not found".format(lTopPackage, lTopComponent),
             fg='red',
@@ -65,17 +66,16 @@ def create(env, kind, projname, component, topdep):
         # Search for the first existing parent  folder in path
         p = lTopComponent
         while True:
-            if not p or exists(lPathmaker.getPath(lTopPackage, p)):
+            if not p or lPathmaker.exists(lPathmaker.getPath(lTopPackage, p)):
                 break
             p, _ = os.path.split(p)
 
         lParent = lPathmaker.getPath(lTopPackage, p)
         secho('\nSuggestions (based on the first existing parent path)', fg='cyan')
-        # When in Py3 https://docs.python.org/3/library/os.html#os.scandir
         for d in [
             join(lParent, s)
-            for s in os.listdir(lParent)
-            if isdir(join(lParent, s))
+            for s in lPathmaker.listdir(lParent)
+            if lPathmaker.isdir(join(lParent, s))
         ]:
             echo(' - ' + d)
         echo()
@@ -83,13 +83,11 @@ def create(env, kind, projname, component, topdep):
         raise click.Abort()
 
     lTopDepPath = lPathmaker.getPath(lTopPackage, lTopComponent, 'include', topdep)
-    if not exists(lTopDepPath):
-        import glob
-
+    if not lPathmaker.exists(lTopDepPath):
         lTopDepDir = lPathmaker.getPath(lTopPackage, lTopComponent, 'include')
         lTopDepCandidates = [
             "'{}'".format(relpath(p, lTopDepDir))
-            for p in glob.glob(join(lTopDepDir, '*.dep'))
+            for p in lPathmaker.expand(join(lTopDepDir, '*.dep'))
         ]
         secho('Top-level dep file {} not found'.format(lTopDepPath), fg='red')
         echo('Suggestions (*.dep):')
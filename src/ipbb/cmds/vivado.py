@@ -26,7 +26,7 @@ from ..tools.common import which, SmartOpen
 from .utils import DirSentry, ensureNoMissingFiles, echoVivadoConsoleError
 
 from ..depparser.VivadoProjectMaker import VivadoProjectMaker
-from ..tools.xilinx import VivadoOpen, VivadoConsoleError, VivadoSnoozer
+from ..tools.xilinx import VivadoOpen, VivadoConsoleError, VivadoSnoozer, kBatchMarker
 from ..defaults import kTopEntity
 
 
@@ -100,13 +100,17 @@ def makeproject(env, aEnableIPCache, aReverse, aOptimise, aToScript, aToStdout):
             )
         ) as lConsole:
 
+            # Project commands are collected, and sent to Vivado in batches
+            lCmds = []
             lVivadoMaker.write(
-                lConsole,
+                lConsole if lDryRun else (lambda *aStrings: lCmds.append(' '.join(aStrings))),
                 lDepFileParser.vars,
                 lDepFileParser.components,
                 lDepFileParser.commands,
                 lDepFileParser.libs,
             )
+            if lCmds:
+                lConsole.executeBatch([c for c in lCmds if c])
 
     except VivadoConsoleError as lExc:
         echoVivadoConsoleError(lExc)
@@ -467,31 +471,59 @@ def bitfile(env):
 
 
 # ------------------------------------------------------------------------------
-def readRunInfo(aConsole, aProps=None):
-    lInfos = {}
-    lProps = aProps if aProps is not None else [
-        'STATUS',
-        'NEEDS_REFRESH',
-        'PROGRESS',
-        # 'IS_IMPLEMENTATION',
-        # 'IS_SYNTHESIS',
-        'STATS.ELAPSED',
-        # 'STATS.ELAPSED',
-    ]
+kRunInfoProps = [
+    'STATUS',
+    'NEEDS_REFRESH',
+    'PROGRESS',
+    # 'IS_IMPLEMENTATION',
+    # 'IS_SYNTHESIS',
+    'STATS.ELAPSED',
+]
 
-    # Gather data about existing runs
-    lRuns = aConsole('get_runs')[0].split()
+# Sentinel lines are hidden from the console output
+kRunInfoPrefix = kBatchMarker + ' run '
 
-    for lRun in sorted(lRuns):
 
-        lCmds = [
-            'get_property {0} [get_runs {1}]'.format(lProp, lRun)
-            for lProp in lProps
-        ]
-        lValues = aConsole(lCmds)
-        lInfos[lRun] = OrderedDict(zip(lProps, lValues))
+# ------------------------------------------------------------------------------
+def makeRunInfoQuery(aProps):
+    """TCL one-liner printing the properties of all runs, one '<prefix><run> <property> <value>' line each
+
+    Backslashes and newlines in values are escaped, so that each value fits in a line.
+    """
+    return (
+        'foreach __ipbb_run [get_runs] {{foreach __ipbb_prop {{{props}}} {{'
+        r'puts "{prefix}$__ipbb_run $__ipbb_prop [string map {{\\ \\\\ \n \\n \r \\r}} [get_property $__ipbb_prop $__ipbb_run]]"'
+        '}}}}; unset -nocomplain __ipbb_run __ipbb_prop'
+    ).format(props=' '.join(aProps), prefix=kRunInfoPrefix)
 
-    return lInfos
+
+# ------------------------------------------------------------------------------
+def parseRunInfo(aLines, aProps):
+    """Parses the output of makeRunInfoQuery
+
+    Returns:
+        OrderedDict: property values by run, sorted by run name
+    """
+    lUnescape = {'n': '\n', 'r': '\r'}
+
+    lInfos = OrderedDict()
+    for lLine in aLines:
+        if lLine is None or not lLine.startswith(kRunInfoPrefix):
+            continue
+
+        lRun, lProp, lValue = (lLine[len(kRunInfoPrefix):].rstrip('\r').split(' ', 2) + [''])[:3]
+        lValue = re.sub(r'\\(.)', lambda m: lUnescape.get(m.group(1), m.group(1)), lValue)
+        lInfos.setdefault(lRun, OrderedDict((p, None) for p in aProps))[lProp] = lValue
+
+    return OrderedDict((k, lInfos[k]) for k in sorted(lInfos))
+
+
+# ------------------------------------------------------------------------------
+def readRunInfo(aConsole, aProps=None):
+    """Reads the properties of all runs, in a single console round trip"""
+    lProps = aProps if aProps is not None else kRunInfoProps
+
+    return parseRunInfo(aConsole(makeRunInfoQuery(lProps), None), lProps)
 
 # ------------------------------------------------------------------------------
 def makeRunsTable(lInfos):
@@ -525,14 +557,7 @@ def status(env):
     lOpenCmds = ['open_project %s' % env.vivadoProjFile]
 
     lInfos = {}
-    lProps = [
-        'STATUS',
-        'NEEDS_REFRESH',
-        'PROGRESS',
-        # 'IS_IMPLEMENTATION',
-        # 'IS_SYNTHESIS',
-        'STATS.ELAPSED',
-    ]
+    lProps = kRunInfoProps
 
     lOOCRegex = re.compile(r'.*_synth_\d+')
     lRunRegex = re.compile(r'(synth|impl)_\d+')
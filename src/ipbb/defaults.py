@@ -2,6 +2,9 @@
 kWorkAreaFile = '.ipbbwork'
 kProjAreaFile = '.ipbbproj'
 kProjUserFile = '.ipbbuser'
+kProjDepCacheFile = '.ipbbdepcache'
 kSourceDir = 'src'
 kProjDir = 'proj'
+kVarDir = 'var'
+kHashCacheFile = 'hashcache'
 kTopEntity = 'top'
\ No newline at end of file
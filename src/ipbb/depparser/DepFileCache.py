@@ -0,0 +1,138 @@
+from __future__ import print_function, absolute_import
+
+import os
+import pickle
+import time
+
+import six
+
+from .._version import __version__
+
+
+# ------------------------------------------------------------------------------
+def fileStamp(aPath):
+    '''Returns the (mtime, size) signature of a file or directory
+
+    Args:
+        aPath (str): Path to inspect
+
+    Returns:
+        tuple: (mtime, size) pair, None if the path does not exist
+    '''
+    try:
+        lStat = os.stat(aPath)
+    except OSError:
+        return None
+    return (getattr(lStat, 'st_mtime_ns', lStat.st_mtime), lStat.st_size)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def stampTime(aStamp):
+    '''Modification time of a fileStamp signature, in seconds'''
+    lMtime = aStamp[0]
+    return lMtime / 1e9 if isinstance(lMtime, six.integer_types) else lMtime
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class DepFileCache(object):
+    """On-disk store of the resolved dependency tree of a DepFileParser
+
+    The cached state is valid as long as none of the dep files read and
+    none of the directories globbed during the original parse have been
+    modified, and the parser configuration (toolset, user variables,
+    top-level dep file) is unchanged.
+
+    Paths modified less than kRacyInterval seconds before the cache was
+    written can change again without their signature changing (coarse
+    timestamps, network filesystems): their signatures are not trusted.
+
+    Attributes:
+        path     (str): Path to the cache file
+        parser   (obj:`DepFileParser`): parser to store/restore
+        key    (tuple): parser configuration the cache is bound to
+        previous (obj:`DepFile`): include tree of an outdated cache entry, for incremental parsing
+    """
+
+    kFormatVersion = 7
+    kRacyInterval = 2.
+    # Never equal to a fileStamp signature
+    kUntrustedStamp = ()
+    kStateFields = ('commands', 'libs', 'components', 'vars', 'missing', '_revDepMap', '_includes', '_stamps')
+
+    # --------------------------------------------------------------
+    def __init__(self, aPath, aParser, aPackage, aComponent, aDepFileName):
+        self.path = aPath
+        self.parser = aParser
+        self.previous = None
+
+        # N.B. the key must be built before parsing, when the parser variables
+        # contain the user and toolset variables only
+        self.key = (
+            __version__,
+            self.kFormatVersion,
+            aParser.pathMaker.rootdir,
+            aParser._toolset,
+            tuple(sorted(aParser.vars.items())),
+            aPackage,
+            aComponent,
+            aDepFileName,
+        )
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def restore(self):
+        '''Loads the cached state into the parser, if valid
+
+        Returns:
+            bool: True if the parser state was restored from the cache
+        '''
+        try:
+            with open(self.path, 'rb') as lFile:
+                lKey, lState, lStoreTime = pickle.load(lFile)
+        except Exception:
+            return False
+
+        if lKey != self.key:
+            return False
+
+        lRacy = set(
+            lPath for lPath, lStamp in lState['_stamps'].items()
+            if lStamp is not None and stampTime(lStamp) > lStoreTime - self.kRacyInterval
+        )
+        if lRacy:
+            # Subtrees depending on racy paths are not reused by incremental parsing either
+            for lNode in lState['_includes'].nodes():
+                for lPath in lRacy.intersection(lNode.stamps):
+                    lNode.stamps[lPath] = self.kUntrustedStamp
+
+        if lRacy or any(fileStamp(lPath) != lStamp for lPath, lStamp in lState['_stamps'].items()):
+            self.previous = lState['_includes']
+            return False
+
+        for lField in self.kStateFields:
+            setattr(self.parser, lField, lState[lField])
+
+        return True
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def store(self):
+        '''Saves the parser state to disk
+
+        Failures (e.g. read-only project areas, unpicklable variables) are
+        not fatal, the next invocation will simply parse again.
+        '''
+        lState = {lField: getattr(self.parser, lField) for lField in self.kStateFields}
+
+        lTmpPath = self.path + '.tmp'
+        try:
+            with open(lTmpPath, 'wb') as lFile:
+                pickle.dump((self.key, lState, time.time()), lFile, pickle.HIGHEST_PROTOCOL)
+            os.rename(lTmpPath, self.path)
+        except (IOError, OSError, pickle.PicklingError, TypeError, AttributeError):
+            if os.path.exists(lTmpPath):
+                os.remove(lTmpPath)
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
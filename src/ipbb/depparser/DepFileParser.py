@@ -1,11 +1,19 @@
 from __future__ import print_function, absolute_import
 
 import argparse
+import dis
 import os
 import glob
 from . import Pathmaker
-from collections import OrderedDict
-from os.path import exists
+from .DepFileCache import fileStamp
+from collections import OrderedDict, namedtuple
+from os.path import dirname
+
+try:
+    from sys import intern
+except ImportError:
+    # Python 2: intern is a builtin
+    pass
 
 # -----------------------------------------------------------------------------
 class Command(object):
@@ -21,13 +29,17 @@ class Command(object):
         Vhdl2008  (bool): src-only flag, toggles the vhdl 2008 syntax for .vhd files
         Finalise  (bool): setup-only flag, identifies setup scripts to be executed at the end
 
+    Package, component and library names are interned, as they are shared by
+    many commands.
     """
+    __slots__ = ('FilePath', 'Package', 'Component', 'Lib', 'Include', 'TopLevel', 'Vhdl2008', 'Finalise')
+
     # --------------------------------------------------------------
     def __init__(self, aFilePath, aPackage, aComponent, aLib, aInclude, aTopLevel, aVhdl2008, aFinalise):
         self.FilePath = aFilePath
-        self.Package = aPackage
-        self.Component = aComponent
-        self.Lib = aLib
+        self.Package = intern(aPackage)
+        self.Component = intern(aComponent)
+        self.Lib = intern(aLib) if aLib is not None else None
         self.Include = aInclude
         self.TopLevel = aTopLevel
         self.Vhdl2008 = aVhdl2008
@@ -54,22 +66,379 @@ class Command(object):
 
     __repr__ = __str__
 
+    # Commands are identified by target path and library
     def __eq__(self, other):
         return (self.FilePath == other.FilePath) and (self.Lib == other.Lib)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.FilePath, self.Lib))
+    # --------------------------------------------------------------
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+def uniquify(aCommands):
+    '''Removes duplicated commands, keeping the last occurrence of each
+
+    Args:
+        aCommands (list): Command objects
+
+    Returns:
+        list: unique commands, in order of last occurrence
+    '''
+    lSeen = set()
+    lUnique = []
+    for lCmd in reversed(aCommands):
+        if lCmd not in lSeen:
+            lSeen.add(lCmd)
+            lUnique.append(lCmd)
+    lUnique.reverse()
+    return lUnique
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+class Undefined(object):
+    '''Marks variables not defined at the time they are referenced'''
+    def __eq__(self, other):
+        return isinstance(other, Undefined)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return 0
+
+    def __reduce__(self):
+        return 'kUndefined'
+
+
+kUndefined = Undefined()
+
+# Pseudo-variable standing for the set of defined variables
+kAllVars = '*'
+
+# Builtins giving expressions access to all variables
+kIntrospectionNames = frozenset(['vars', 'dir', 'locals', 'globals', 'eval', 'exec'])
+
+
+# Builtins whose result only depends on their arguments
+kPureBuiltins = frozenset([
+    'abs', 'all', 'any', 'bool', 'dict', 'float', 'int', 'isinstance', 'len', 'list',
+    'max', 'min', 'range', 'round', 'set', 'sorted', 'str', 'sum', 'tuple',
+])
+
+# Opcodes reading a variable, module or builtin by name
+kLoadNameOps = frozenset(['LOAD_NAME', 'LOAD_GLOBAL', 'LOAD_FROM_DICT_OR_GLOBALS'])
+
+
+def codeNames(aCode):
+    '''Returns the names referenced by a code object, including nested ones'''
+    lNames = set(aCode.co_names)
+    for lConst in aCode.co_consts:
+        if hasattr(lConst, 'co_names'):
+            lNames |= codeNames(lConst)
+    return lNames
+
+
+def loadedNames(aCode):
+    '''
+    Returns the names a code object reads, including nested ones, but not
+    attribute names or assignment targets. Python 2: all referenced names.
+    '''
+    if not hasattr(dis, 'get_instructions'):
+        return codeNames(aCode)
+
+    lNames = set(i.argval for i in dis.get_instructions(aCode) if i.opname in kLoadNameOps)
+    for lConst in aCode.co_consts:
+        if hasattr(lConst, 'co_names'):
+            lNames |= loadedNames(lConst)
+    return lNames
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+class DirectiveCache(object):
+    '''
+    Compiled '?cond?' and '@var=' directives, and their results.
+
+    Code objects are indexed by expression text. Results are indexed by code
+    object and by the values, and types, of the variables the expression
+    references, so that an expression is only evaluated again when one of
+    them changes.
+    Expressions reading anything but variables and pure builtins (e.g.
+    modules, or variables not defined yet), or referencing unhashable
+    values, are always evaluated.
+    '''
+
+    # Cleared when full, to bound memory usage in long-lived processes
+    kMaxEntries = 10000
+
+    # --------------------------------------------------------------
+    def __init__(self):
+        super(DirectiveCache, self).__init__()
+        self._code = {}
+        # Names read by each code object
+        self._loaded = {}
+        self._results = {}
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def compile(self, aExpr, aMode):
+        '''
+        Returns:
+            tuple: code object and names it references
+        '''
+        # Surrounding whitespace is not significant in directives, but compile rejects it
+        lExpr = aExpr.strip()
+        lKey = (lExpr, aMode)
+        try:
+            return self._code[lKey]
+        except KeyError:
+            pass
+
+        if len(self._code) >= self.kMaxEntries:
+            self._code.clear()
+            self._loaded.clear()
+        lCode = compile(lExpr, '<directive>', aMode)
+        lCompiled = self._code[lKey] = (lCode, frozenset(codeNames(lCode)))
+        self._loaded[lCode] = frozenset(loadedNames(lCode))
+        return lCompiled
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _resultKey(self, aCode, aNames, aVars):
+        if not kIntrospectionNames.isdisjoint(aNames):
+            return None
+
+        # Results depending on the outside world (os, open, ...) are not reusable
+        lLoaded = self._loaded.get(aCode)
+        if lLoaded is None or any(n not in aVars and n not in kPureBuiltins for n in lLoaded):
+            return None
+
+        # Equal values of different types (1, 1.0, True) may not give the same result
+        lValues = [aVars.get(n, kUndefined) for n in sorted(aNames)]
+        lKey = (aCode, tuple((type(v), v) for v in lValues))
+        try:
+            hash(lKey)
+        except TypeError:
+            return None
+        return lKey
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _store(self, aKey, aResult):
+        if len(self._results) >= self.kMaxEntries:
+            self._results.clear()
+        self._results[aKey] = aResult
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def evaluate(self, aCode, aNames, aVars):
+        '''Evaluates a conditional expression against aVars'''
+        lKey = self._resultKey(aCode, aNames, aVars)
+        if lKey is None:
+            return eval(aCode, None, aVars)
+
+        try:
+            return self._results[lKey]
+        except KeyError:
+            lValue = eval(aCode, None, aVars)
+            self._store(lKey, lValue)
+            return lValue
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def execute(self, aCode, aNames, aVars):
+        '''Executes an assignment, updating aVars'''
+        lKey = self._resultKey(aCode, aNames, aVars)
+        if lKey is None:
+            exec(aCode, None, aVars)
+            return
+
+        try:
+            aVars.update(self._results[lKey])
+            return
+        except KeyError:
+            pass
+
+        # Only the referenced variables are visible to the statement
+        lLocals = {n: aVars[n] for n in aNames if n in aVars}
+        lBefore = dict(lLocals)
+        exec(aCode, None, lLocals)
+        lAssigned = {
+            k: v for k, v in lLocals.items() if k not in lBefore or v is not lBefore[k]
+        }
+        aVars.update(lAssigned)
+
+        try:
+            hash(tuple(lAssigned.values()))
+        except TypeError:
+            # Mutable values are not shared across parses
+            return
+        self._store(lKey, lAssigned)
+    # --------------------------------------------------------------
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+class ParseMemo(object):
+    """Parse results shared by several DepFileParser instances
+
+    Lets parsers of different projects in the same work area reuse each
+    other's parsed dep file lines, filesystem signatures and resolved
+    include subtrees. Only valid as long as the sources do not change.
+
+    Attributes:
+        subtrees (dict): resolved DepFile nodes, by (package, component, dep file)
+        stamps   (dict): filesystem signatures, by path
+        lines    (dict): parsed dep file lines, by line text
+    """
+    def __init__(self):
+        super(ParseMemo, self).__init__()
+        self.subtrees = {}
+        self.stamps = {}
+        self.lines = {}
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+MissingDep = namedtuple('MissingDep', ['path', 'cmd', 'package', 'component', 'depfile'])
+
+
+class MissingIndex(object):
+    """Missing dependencies of a parse, indexed for reporting and lookup
+
+    Attributes:
+        records    (list): MissingDep records, in parse order
+        paths       (set): path expressions not resolved
+        files      (dict): package -> component -> path expression -> set of including dep files
+        components (dict): package -> set of missing components, for existing and missing packages
+        packages    (set): missing packages
+
+    Missing components and packages are checked against the filesystem when
+    the index is built.
+    """
+
+    # --------------------------------------------------------------
+    def __init__(self, aMissing, aPathmaker):
+        super(MissingIndex, self).__init__()
+        self.records = [MissingDep._make(m) for m in aMissing]
+        self.paths = set()
+        self.files = OrderedDict()
+        self.components = OrderedDict()
+        self.packages = set()
+
+        self._byPackage = {}
+        self._byComponent = {}
+        self._byDepFile = {}
+
+        lExists = {}
+        for lRec in self.records:
+            self.paths.add(lRec.path)
+            self.files.setdefault(
+                lRec.package, OrderedDict()
+            ).setdefault(
+                lRec.component, OrderedDict()
+            ).setdefault(
+                lRec.path, set()
+            ).add(lRec.depfile)
+
+            self._byPackage.setdefault(lRec.package, []).append(lRec)
+            self._byComponent.setdefault((lRec.package, lRec.component), []).append(lRec)
+            self._byDepFile.setdefault(lRec.depfile, []).append(lRec)
+
+            for lKey in ((lRec.package,), (lRec.package, lRec.component)):
+                if lKey not in lExists:
+                    lExists[lKey] = aPathmaker.exists(aPathmaker.getPath(*lKey))
+
+            if not lExists[lRec.package, lRec.component]:
+                self.components.setdefault(lRec.package, set()).add(lRec.component)
+            if not lExists[(lRec.package,)]:
+                self.packages.add(lRec.package)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def __len__(self):
+        return len(self.records)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def lookup(self, aPackage=None, aComponent=None, aDepFile=None, aCmd=None):
+        '''Returns the missing dependencies matching all the criteria specified
+
+        Args:
+            aPackage   (str): package of the missing target
+            aComponent (str): component of the missing target, requires aPackage
+            aDepFile   (str): absolute path of the including dep file
+            aCmd       (str): dep command (src, include, ...)
+
+        Returns:
+            list: MissingDep records
+        '''
+        if aComponent is not None and aPackage is None:
+            raise ValueError('A package is required to look up missing dependencies by component')
+
+        if aDepFile is not None:
+            lRecords = self._byDepFile.get(aDepFile, [])
+        elif aComponent is not None:
+            lRecords = self._byComponent.get((aPackage, aComponent), [])
+        elif aPackage is not None:
+            lRecords = self._byPackage.get(aPackage, [])
+        else:
+            lRecords = self.records
+
+        return [
+            r for r in lRecords
+            if (aPackage is None or r.package == aPackage)
+            and (aComponent is None or r.component == aComponent)
+            and (aCmd is None or r.cmd == aCmd)
+        ]
     # --------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
+
 # -----------------------------------------------------------------------------
 # Experimental
 class DepFile(object):
-    """docstring for DepFile"""
+    """Node of the include tree built by DepFileParser
+
+    Attributes:
+        pkg       (str): package the dep file belongs to
+        cmp       (str): component the dep file belongs to
+        dep       (str): dep file name, relative to the component include folder
+        path      (str): absolute path of the dep file
+        commands (list): entries produced by the dep file, in order: (cmd, Command) pairs,
+                         missing file records, (library, ) records of the lines
+                         setting a library and DepFile nodes for included files
+        stamps   (dict): signatures of the dep file and of the directories globbed by its lines
+        globs     (set): directories actually matched against wildcard expressions, a subset of stamps
+        varDeps  (dict): variables referenced by the dep file and its includes, with their value on entry
+        assigned (dict): variables defined by the dep file and its includes
+    """
+    __slots__ = ('pkg', 'cmp', 'dep', 'path', 'commands', 'stamps', 'globs', 'varDeps', 'assigned')
+
     def __init__(self, aPackage, aComponent, aDepFileName):
         super(DepFile, self).__init__()
-        self.pkg = aPackage
-        self.cmp = aComponent
+        self.pkg = intern(aPackage)
+        self.cmp = intern(aComponent)
         self.dep = aDepFileName
+        self.path = None
         self.commands = []
-        self.cmds = OrderedDict()
+        self.stamps = {}
+        self.globs = set()
+        self.varDeps = {}
+        self.assigned = {}
+
+    def nodes(self):
+        '''Iterates over the nodes of the include tree rooted in this DepFile'''
+        lStack = [self]
+        while lStack:
+            lNode = lStack.pop()
+            yield lNode
+            lStack.extend(c for c in reversed(lNode.commands) if isinstance(c, DepFile))
 
     def __str__(self):
         pathmaker = Pathmaker.Pathmaker('', 1)
@@ -123,15 +492,140 @@ class DepLineParserError(Exception):
     pass
 
 
+class DepFileCycleError(RuntimeError):
+    """Raised when a dep file includes itself, directly or through other dep files
+
+    Attributes:
+        chain (list): paths of the dep files in the cycle, the first one repeated at the end
+    """
+    def __init__(self, aChain):
+        super(DepFileCycleError, self).__init__('Include cycle detected: ' + ' -> '.join(aChain))
+        self.chain = aChain
+
+
 class DepLineParser(argparse.ArgumentParser):
     def error(self, message):
         raise DepLineParserError(message)
 # ------------------------------------------------------------------------------
 
 
+# ------------------------------------------------------------------------------
+class DepLineTokenizer(object):
+    '''
+    Fast parser for dep file lines.
+
+    Implements the subset of DepLineParser's grammar used in practice: a
+    command followed by known options and a single block of target files.
+    Any other form (abbreviated options, '--option=value', clustered short
+    options, malformed lines) is rejected by returning None, in which case
+    the line must be handed over to DepLineParser, which either resolves it
+    or reports the error.
+    '''
+
+    # Options shared by all commands
+    kValueOpts = {'-c': 'component', '--component': 'component', '--cd': 'cd'}
+
+    # command: (flag options, additional value options, files required)
+    kGrammar = {
+        'include': ({}, {}, False),
+        'setup': ({'-f': 'finalise', '--finalise': 'finalise'}, {}, False),
+        'src': (
+            {'-n': 'noinclude', '--noinclude': 'noinclude', '--vhdl2008': 'vhdl2008'},
+            {'-l': 'lib', '--lib': 'lib'},
+            True
+        ),
+        'addrtab': ({'-t': 'toplevel', '--toplevel': 'toplevel'}, {}, False),
+        'iprepo': ({}, {}, False),
+    }
+
+    # --------------------------------------------------------------
+    def __init__(self):
+        super(DepLineTokenizer, self).__init__()
+
+        # Compile the grammar into per-command lookup tables and defaults
+        self._tables = {}
+        for lCmd, (lFlagOpts, lValueOpts, lFilesRequired) in self.kGrammar.items():
+            lValues = dict(self.kValueOpts)
+            lValues.update(lValueOpts)
+
+            lDefaults = {'cmd': lCmd, 'component': (None, None)}
+            lDefaults.update((lDest, None) for lDest in lValues.values() if lDest != 'component')
+            lDefaults.update((lDest, False) for lDest in lFlagOpts.values())
+
+            self._tables[lCmd] = (lFlagOpts, lValues, lFilesRequired, lDefaults)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def __call__(self, aTokens):
+        '''
+        Args:
+            aTokens (list): line tokens
+
+        Returns:
+            argparse.Namespace: parsed line, None if the line has to be parsed by DepLineParser
+        '''
+        lTable = self._tables.get(aTokens[0]) if aTokens else None
+        if lTable is None:
+            return None
+
+        lFlagOpts, lValueOpts, lFilesRequired, lDefaults = lTable
+        lArgs = dict(lDefaults)
+        lFiles = None
+
+        i, n = 1, len(aTokens)
+        while i < n:
+            lToken = aTokens[i]
+
+            # Target files, one contiguous block only
+            if lToken[0] != '-':
+                if lFiles is not None:
+                    return None
+                j = i + 1
+                while j < n and aTokens[j][0] != '-':
+                    j += 1
+                lFiles = aTokens[i:j]
+                i = j
+                continue
+
+            lDest = lFlagOpts.get(lToken)
+            if lDest is not None:
+                lArgs[lDest] = True
+                i += 1
+                continue
+
+            lDest = lValueOpts.get(lToken)
+            if lDest is None or i + 1 == n or aTokens[i + 1][0] == '-':
+                return None
+
+            lValue = aTokens[i + 1]
+            if lDest == 'component':
+                # Same as ComponentAction
+                lSeparators = lValue.count(':')
+                if lSeparators > 1:
+                    return None
+                lValue = tuple(lValue.split(':')) if lSeparators else (None, lValue)
+
+            lArgs[lDest] = lValue
+            i += 2
+
+        if lFiles is None:
+            if lFilesRequired:
+                return None
+            lFiles = []
+
+        lArgs['file'] = lFiles
+        return argparse.Namespace(**lArgs)
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+
 class DepFileParser(object):
+
+    # Compiled directives, shared by all parsers
+    _directives = DirectiveCache()
+
     # ----------------------------------------------------------------------------------------------------------------------------
-    def __init__(self, aToolSet, aPathmaker, aVariables={}, aVerbosity=0):
+    def __init__(self, aToolSet, aPathmaker, aVariables={}, aVerbosity=0, aMemo=None, aProfiler=None):
         # --------------------------------------------------------------
         # Member variables
         self._toolset = aToolSet
@@ -139,6 +633,16 @@ class DepFileParser(object):
         self._includes = None
         self._verbosity = aVerbosity
         self._revDepMap = {}
+        # Optional instrumentation hook (DepFileProfiler)
+        self.profiler = aProfiler
+        # Signatures of the dep files read and of the directories globbed
+        self._stamps = OrderedDict()
+        # Incremental parsing: include tree of the previous parse, indexed by dep file
+        self._previous = {}
+        self._unchanged = {}
+        # Parse-wide memos, optionally shared with other parsers
+        self._sharedMemo = aMemo
+        self._resetMemos()
 
         self.pathMaker = aPathmaker
 
@@ -148,6 +652,8 @@ class DepFileParser(object):
         self.components = OrderedDict()
 
         self.missing = list()
+        self._missingIndex = None
+        self._dependantsIndex = None
         # --------------------------------------------------------------
 
         # --------------------------------------------------------------
@@ -223,6 +729,8 @@ class DepFileParser(object):
         subp.add_argument('file', nargs='*')
         # map parser method to self
         self.parseLine = parser.parse_args
+        # Fast path for the common line forms, falls back on parseLine
+        self.parseLineFast = DepLineTokenizer()
         # --------------------------------------------------------------
     # ----------------------------------------------------------------------------------------------------------------------------
 
@@ -304,70 +812,380 @@ class DepFileParser(object):
 
     # ----------------------------------------------------------------------------------------------------------------------------
     @property
-    def missingPaths(self):
-        lNotFound = set()
-
-        for lPathExpr, aCmd, lPackage, lComponent, lDepFilePath in self.missing:
-            lNotFound.add(lPathExpr)
+    def missingIndex(self):
+        '''
+        Index of the missing dependencies, rebuilt only when `missing` changes
+        '''
+        # missing is only ever appended to, or replaced
+        lKey = (id(self.missing), len(self.missing))
+        if self._missingIndex is None or self._missingIndex[0] != lKey:
+            self._missingIndex = (lKey, MissingIndex(self.missing, self.pathMaker))
+        return self._missingIndex[1]
+    # ----------------------------------------------------------------------------------------------------------------------------
 
-        return lNotFound
+    # ----------------------------------------------------------------------------------------------------------------------------
+    @property
+    def missingPaths(self):
+        return self.missingIndex.paths
     # ----------------------------------------------------------------------------------------------------------------------------
 
     # ----------------------------------------------------------------------------------------------------------------------------
     @property
     def missingFiles(self):
-        lNotFound = OrderedDict()
-        for lPathExpr, aCmd, lPackage, lComponent, lDepFilePath in self.missing:
-            lNotFound.setdefault(
-                lPackage,
-                OrderedDict()
-            ).setdefault(
-                lComponent,
-                OrderedDict()
-            ).setdefault(
-                lPathExpr,
-                set()
-            ).add(lDepFilePath)
-
-        return lNotFound
+        return self.missingIndex.files
     # ----------------------------------------------------------------------------------------------------------------------------
 
     # ----------------------------------------------------------------------------------------------------------------------------
     @property
     def missingComponents(self):
-        lNotFound = OrderedDict()
+        return self.missingIndex.components
+    # ----------------------------------------------------------------------------------------------------------------------------
 
-        for lPathExpr, aCmd, lPackage, lComponent, lDepFilePath in self.missing:
-            if os.path.exists(self.pathMaker.getPath(lPackage, lComponent)):
+    # ----------------------------------------------------------------------------------------------------------------------------
+    @property
+    def missingPackages(self):
+        return self.missingIndex.packages
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def dependants(self, aPath):
+        '''
+        Dep files depending on a path: the dep file itself, the dep files
+        including it or referring to it (even if missing), and those
+        matching wildcard expressions in the directory it is located in (new
+        files could match them).
+
+        Args:
+            aPath (str): absolute, normalised path
+
+        Returns:
+            list: (dep file path, package, component) tuples, where package and
+                component are those the file is added to
+        '''
+        if self._dependantsIndex is None:
+            self._dependantsIndex = self._indexDependants()
+        lFiles, lDirs = self._dependantsIndex
+
+        lDependants = OrderedDict.fromkeys(lFiles.get(aPath, []))
+        lDependants.update(OrderedDict.fromkeys(lDirs.get(dirname(aPath), [])))
+        return list(lDependants)
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _indexDependants(self):
+        '''
+        Builds the path -> dependant dep files maps, for files and globbed directories
+        '''
+        lFiles = {}
+        lDirs = {}
+        if self._includes is None:
+            return lFiles, lDirs
+
+        lVisited = set()
+        for lNode in self._includes.nodes():
+            if id(lNode) in lVisited:
                 continue
+            lVisited.add(id(lNode))
 
-            lNotFound.setdefault(lPackage, set()).add(lComponent)
+            lFiles.setdefault(lNode.path, OrderedDict())[lNode.path, lNode.pkg, lNode.cmp] = None
+            # Directories holding literal paths are stamped too, but new files
+            # there only matter to the expressions with wildcards
+            for lPath in lNode.globs:
+                lDirs.setdefault(lPath, OrderedDict())[lNode.path, lNode.pkg, lNode.cmp] = None
 
-        return lNotFound
+            for lEntry in lNode.commands:
+                if isinstance(lEntry, DepFile):
+                    continue
+                if len(lEntry) == 2:
+                    lCommand = lEntry[1]
+                    lFiles.setdefault(lCommand.FilePath, OrderedDict())[lNode.path, lCommand.Package, lCommand.Component] = None
+                elif len(lEntry) > 2 and not glob.has_magic(lEntry[0]):
+                    # Missing file, which would be added if created
+                    lFiles.setdefault(lEntry[0], OrderedDict())[lNode.path, lEntry[2], lEntry[3]] = None
+
+        return lFiles, lDirs
     # ----------------------------------------------------------------------------------------------------------------------------
 
     # ----------------------------------------------------------------------------------------------------------------------------
-    @property
-    def missingPackages(self):
-        lNotFound = set()
+    def _currentStamp(self, aPath):
+        '''
+        Signature of a path, evaluated at most once per parse
+        '''
+        if aPath not in self._fsStamps:
+            self._fsStamps[aPath] = fileStamp(aPath)
+        return self._fsStamps[aPath]
+    # ----------------------------------------------------------------------------------------------------------------------------
 
-        for lPathExpr, aCmd, lPackage, lComponent, lDepFilePath in self.missing:
-            if os.path.exists(self.pathMaker.getPath(lPackage)):
-                continue
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _stamp(self, aPath, aGlobbed=False):
+        '''
+        Records the signature of a path the parse result depends upon
+        '''
+        lStamp = self._currentStamp(aPath)
+        self._includes.stamps[aPath] = lStamp
+        self._stamps[aPath] = lStamp
+        if aGlobbed:
+            self._includes.globs.add(aPath)
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _stampGlob(self, aPathExpr):
+        '''
+        Records the signatures of the directories a glob expression was expanded in
+        '''
+        lDirExpr = dirname(aPathExpr)
+        if not glob.has_magic(lDirExpr):
+            self._stamp(lDirExpr, glob.has_magic(aPathExpr))
+            return
+
+        # Wildcards in the directory part: track the first literal ancestor and all matching directories
+        lAnchor = lDirExpr
+        while glob.has_magic(lAnchor):
+            lAnchor = dirname(lAnchor)
+        self._stamp(lAnchor)
+        for lDir in self.pathMaker.expand(lDirExpr):
+            self._stamp(lDir, True)
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _varState(self, aName):
+        '''
+        Current value of a variable, as tracked in DepFile.varDeps
+        '''
+        if aName == kAllVars:
+            return tuple(sorted(self.vars))
+        return self.vars.get(aName, kUndefined)
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _trackVars(self, aNames):
+        '''
+        Records the variables the current dep file depends upon
+        '''
+        if not kIntrospectionNames.isdisjoint(aNames):
+            aNames = set(aNames) | set(self.vars) | {kAllVars}
 
-            lNotFound.add(lPackage)
-        return lNotFound
+        lVarDeps = self._includes.varDeps
+        for lName in aNames:
+            if lName not in lVarDeps:
+                lVarDeps[lName] = self._varState(lName)
     # ----------------------------------------------------------------------------------------------------------------------------
 
     # ----------------------------------------------------------------------------------------------------------------------------
-    def parse(self, aPackage, aComponent, aDepFileName):
+    def _isUnchanged(self, aNode):
+        '''
+        Checks whether none of the paths a subtree of the previous parse depends upon has changed
+        '''
+        lKey = id(aNode)
+        if lKey not in self._unchanged:
+            self._unchanged[lKey] = (
+                all(self._currentStamp(lPath) == lStamp for lPath, lStamp in aNode.stamps.items())
+                and all(self._isUnchanged(c) for c in aNode.commands if isinstance(c, DepFile))
+            )
+        return self._unchanged[lKey]
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _varsMatch(self, aNode):
+        '''
+        Checks whether the variables a subtree depends upon have the same value they had when it was parsed
+        '''
+        return all(self._varState(lName) == lValue for lName, lValue in aNode.varDeps.items())
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _findReusable(self, aPackage, aComponent, aDepFileName):
+        '''
+        Looks for a subtree, resolved earlier in this parse or in the previous one, that can be
+        spliced in place of parsing the dep file
+        '''
+        lKey = (aPackage, aComponent, aDepFileName)
+        for lNode in self._memo.get(lKey, []):
+            if self._varsMatch(lNode):
+                return lNode
+
+        for lNode in self._previous.get(lKey, []):
+            if self._varsMatch(lNode) and self._isUnchanged(lNode):
+                return lNode
+        return None
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _replay(self, aNode):
+        '''
+        Applies the entries of a previously parsed subtree to the parser state
+
+        Yields:
+            tuple: (command kind, Command) pairs, in order
+        '''
+        # Nodes being replayed, with an iterator on their entries
+        lStack = [(aNode, iter(aNode.commands))]
+        while lStack:
+            lNode, lEntries = lStack[-1]
+            lEntry = next(lEntries, None)
+            if lEntry is None:
+                self._stamps.update(lNode.stamps)
+                lStack.pop()
+            elif isinstance(lEntry, DepFile):
+                self.components.setdefault(lEntry.pkg, []).append(lEntry.cmp)
+                lStack.append((lEntry, iter(lEntry.commands)))
+            elif len(lEntry) == 1:
+                self.libs.append(lEntry[0])
+            elif len(lEntry) == 2:
+                lCmd, lCommand = lEntry
+                self.components.setdefault(lCommand.Package, []).append(lCommand.Component)
+                self.commands[lCmd].append(lCommand)
+                self._revDepMap.setdefault(lCommand.FilePath, []).append(lNode.path)
+                yield lEntry
+            else:
+                self.missing.append(lEntry)
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _attach(self, aParentInclude, aNode):
+        '''
+        Adds a resolved subtree to its parent, which inherits its variable dependencies and definitions
+        '''
+        aParentInclude.commands.append(aNode)
+        for lName, lValue in aNode.varDeps.items():
+            aParentInclude.varDeps.setdefault(lName, lValue)
+        aParentInclude.assigned.update(aNode.assigned)
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _splice(self, aNode, aParentInclude):
+        '''
+        Reuses a previously parsed subtree in place of parsing its dep file
+        '''
+        if self._verbosity > 1:
+            print('=' * (self._depth + 1), 'Reusing',
+                  aNode.pkg, aNode.cmp, aNode.dep)
+
+        self.vars.update(aNode.assigned)
+        for lPair in self._replay(aNode):
+            yield lPair
+
+        if aParentInclude:
+            self._attach(aParentInclude, aNode)
+        else:
+            self._includes = aNode
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def parse(self, aPackage, aComponent, aDepFileName, aPrevious=None):
         '''
         Parses a dependency file from package aPackage/aComponent
+
+        If the include tree of an earlier parse (aPrevious) is provided, the
+        parse is incremental: dep files whose subtree (dep files and globbed
+        directories) is unchanged are spliced in from the previous result.
+        '''
+        for _ in self._parse(aPackage, aComponent, aDepFileName, aPrevious):
+            pass
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def iterparse(self, aPackage, aComponent, aDepFileName, aPrevious=None, aUnique=False):
+        '''
+        Parses a dependency file, yielding commands as they are resolved
+
+        The parser state (commands, components, missing, ...) is complete,
+        and the same as after `parse`, once the iterator is exhausted.
+
+        Args:
+            aUnique (bool): skip commands already yielded, in the same command
+                group. N.B. the first occurrence of each command is yielded,
+                while the `commands` lists keep the last one.
+
+        Yields:
+            tuple: (command kind, Command) pairs, in dep file order
+        '''
+        lCommands = self._parse(aPackage, aComponent, aDepFileName, aPrevious)
+        if not aUnique:
+            for lPair in lCommands:
+                yield lPair
+            return
+
+        lSeen = {lCmd: set() for lCmd in self.commands}
+        for lCmd, lCommand in lCommands:
+            if lCommand in lSeen[lCmd]:
+                continue
+            lSeen[lCmd].add(lCommand)
+            yield lCmd, lCommand
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _parse(self, aPackage, aComponent, aDepFileName, aPrevious=None):
+        '''
+        Parses a dependency file and its includes, yielding the commands they produce
+
+        The include tree is walked with an explicit stack of per dep file
+        generators (see `_visit`) rather than by recursion: the include depth
+        is not bound by the interpreter recursion limit, and include cycles
+        are detected as soon as they are entered.
+
+        Raises:
+            DepFileCycleError: if a dep file includes itself, directly or not
+        '''
+        if aPrevious is not None:
+            for lNode in aPrevious.nodes():
+                lNodes = self._previous.setdefault((lNode.pkg, lNode.cmp, lNode.dep), [])
+                if lNode not in lNodes:
+                    lNodes.append(lNode)
+
+        # Dep files being parsed, outermost first, and the generators parsing them
+        lChain = [self.pathMaker.getPath(aPackage, aComponent, 'include', aDepFileName)]
+        lActive = set(lChain)
+        lStack = [self._visit(aPackage, aComponent, aDepFileName)]
+        while lStack:
+            try:
+                lCmd, lEntry = next(lStack[-1])
+            except StopIteration:
+                lStack.pop()
+                lActive.discard(lChain.pop())
+                continue
+
+            if lCmd != 'include':
+                yield lCmd, lEntry
+                continue
+
+            # Include request, parse the dep file before resuming the current one
+            lPackage, lComponent, lFile, lFilePath = lEntry
+            if lFilePath in lActive:
+                self._depth = 0
+                raise DepFileCycleError(lChain[lChain.index(lFilePath):] + [lFilePath])
+            lChain.append(lFilePath)
+            lActive.add(lFilePath)
+            lStack.append(self._visit(lPackage, lComponent, lFile))
+
+        self._exitTopLevel()
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _visit(self, aPackage, aComponent, aDepFileName):
+        '''
+        Parses a single dependency file, or reuses an earlier result
+
+        Yields:
+            tuple: (command kind, Command) pairs, and ('include', (package,
+                component, dep file, path)) requests for the dep files to parse
+                in place of each include line
         '''
         # --------------------------------------------------------------
         # We have gone one layer further down the rabbit hole
         lParentInclude = self._includes if self._depth != 0 else None
 
+        # --------------------------------------------------------------
+        # Reuse the result of an earlier include of the same dep file, if still valid
+        lReusable = self._findReusable(aPackage, aComponent, aDepFileName)
+        if lReusable is not None:
+            if self.profiler is not None:
+                self.profiler.reuse(lReusable.path, aPackage, aComponent)
+            for lPair in self._splice(lReusable, lParentInclude):
+                yield lPair
+            return
+        # --------------------------------------------------------------
+
         self._includes = DepFile(aPackage, aComponent, aDepFileName)
         self._depth += 1
         # --------------------------------------------------------------
@@ -378,13 +1196,19 @@ class DepFileParser(object):
         # --------------------------------------------------------------
         lDepFilePath = self.pathMaker.getPath(
             aPackage, aComponent, 'include', aDepFileName)
+        self._includes.path = lDepFilePath
         # --------------------------------------------------------------
 
-        if not exists(lDepFilePath):
+        self._stamp(lDepFilePath)
+        if not self.pathMaker.exists(lDepFilePath):
             self.missing.append(
                 (lDepFilePath, 'include', aPackage, aComponent, lDepFilePath))
             raise OSError("File " + lDepFilePath + " does not exist")
 
+        lProfiler = self.profiler
+        if lProfiler is not None:
+            lProfiler.enter(lDepFilePath, aPackage, aComponent)
+
         with open(lDepFilePath) as lDepFile:
             for lLineNum, lLine in enumerate(lDepFile):
 
@@ -395,6 +1219,9 @@ class DepFileParser(object):
                     continue
                 # --------------------------------------------------------------
 
+                if lProfiler is not None:
+                    lProfiler.line()
+
                 # --------------------------------------------------------------
                 # Process the assignment directive
                 if lLine[0] == "@":
@@ -402,15 +1229,24 @@ class DepFileParser(object):
                     if len(lTokenized) != 2:
                         raise SystemExit("@ directives must be key=value pairs. Found '{0}' in {1}".format(
                             lLine, aDepFileName))
+                    self._trackVars([lTokenized[0].strip()])
                     if lTokenized[0].strip() in self.vars:
                         print("Warning!", lTokenized[0].strip(
                         ), "already defined. Not redefining.")
                     else:
+                        lStart = lProfiler.clock() if lProfiler is not None else None
                         try:
-                            exec(lLine[1:], None, self.vars)
+                            lCode, lNames = self._directives.compile(lLine[1:], 'exec')
+                            self._trackVars(lNames)
+                            self._directives.execute(lCode, lNames, self.vars)
                         except:
                             raise SystemExit(
                                 "Parsing directive failed in {0} , line '{1}'".format(aDepFileName, lLine))
+                        if lProfiler is not None:
+                            lProfiler.directive(lProfiler.clock() - lStart)
+                        lKey = lTokenized[0].strip()
+                        if lKey in self.vars:
+                            self._includes.assigned[lKey] = self.vars[lKey]
                     continue
                 # --------------------------------------------------------------
 
@@ -426,12 +1262,16 @@ class DepFileParser(object):
                             )
                         )
 
+                    lStart = lProfiler.clock() if lProfiler is not None else None
                     try:
-                        lExprValue = eval(
-                            lLine[lTokens[0] + 1: lTokens[1]], None, self.vars)
+                        lCode, lNames = self._directives.compile(lLine[lTokens[0] + 1: lTokens[1]], 'eval')
+                        self._trackVars(lNames)
+                        lExprValue = self._directives.evaluate(lCode, lNames, self.vars)
                     except:
                         raise SystemExit(
                             "Parsing directive failed in {0} , line '{1}'".format(aDepFileName, lLine))
+                    if lProfiler is not None:
+                        lProfiler.directive(lProfiler.clock() - lStart)
 
                     if not isinstance(lExprValue, bool):
                         raise SystemExit("Directive does not evaluate to boolean type in {0} , line '{1}'".format(
@@ -446,13 +1286,19 @@ class DepFileParser(object):
                 # --------------------------------------------------------------
 
                 # --------------------------------------------------------------
-                # Parse the line using arg_parse
-                try:
-                    lParsedLine = self.parseLine(lLine.split())
-                except DepLineParserError as e:
-                    lMsg = "Error caught while parsing line {0} in file {1}".format(lLineNum, lDepFilePath) + "\n"
-                    lMsg += "Details - " + str(e) + ": '" + lLine + "'"
-                    raise RuntimeError(lMsg)
+                # Parse the line, using arg_parse for forms the tokenizer doesn't handle
+                lParsedLine = self._lines.get(lLine)
+                if lParsedLine is None:
+                    lTokens = lLine.split()
+                    lParsedLine = self.parseLineFast(lTokens)
+                    if lParsedLine is None:
+                        try:
+                            lParsedLine = self.parseLine(lTokens)
+                        except DepLineParserError as e:
+                            lMsg = "Error caught while parsing line {0} in file {1}".format(lLineNum, lDepFilePath) + "\n"
+                            lMsg += "Details - " + str(e) + ": '" + lLine + "'"
+                            raise RuntimeError(lMsg)
+                    self._lines[lLine] = lParsedLine
 
                 if self._verbosity > 1:
                     print(' ' * self._depth, '- Parsed line', vars(lParsedLine))
@@ -487,8 +1333,12 @@ class DepFileParser(object):
                 lFileLists = []
                 for lFileExpr in lFileExprList:
                     # Expand file expression
+                    lStart = lProfiler.clock() if lProfiler is not None else None
                     lPathExpr, lFileList = self.pathMaker.glob(
                         lPackage, lComponent, lParsedLine.cmd, lFileExpr, cd=lParsedLine.cd)
+                    self._stampGlob(lPathExpr)
+                    if lProfiler is not None:
+                        lProfiler.glob(lProfiler.clock() - lStart)
 
                     # --------------------------------------------------------------
                     # Store the result and move on
@@ -512,7 +1362,7 @@ class DepFileParser(object):
                 if lParsedLine.cmd == "include":
                     for lFileList in lFileLists:
                         for lFile, lFilePath in lFileList:
-                            self.parse(lPackage, lComponent, lFile)
+                            yield 'include', (lPackage, lComponent, lFile, lFilePath)
 
                 else:
                     # --------------------------------------------------------------
@@ -538,7 +1388,9 @@ class DepFileParser(object):
                     # not
                     if ('lib' in lParsedLine) and (lParsedLine.lib):
                         lLib = lParsedLine.lib
+                        # Recorded once per line, whether files were found or not
                         self.libs.append(lLib)
+                        self._includes.commands.append((lLib, ))
                     else:
                         lLib = None
                     # --------------------------------------------------------------
@@ -571,44 +1423,68 @@ class DepFileParser(object):
                             lCommand = Command(lFilePath, lPackage, lComponent, lLib, lInclude, lTopLevel, lVhdl2008, lFinalise)
                             self.commands[lParsedLine.cmd].append(lCommand)
 
-                            self._includes.commands.append(lCommand)
+                            self._includes.commands.append((lParsedLine.cmd, lCommand))
 
                             self._revDepMap.setdefault(lFilePath, []).append(lDepFilePath)
+
+                            yield lParsedLine.cmd, lCommand
                         # --------------------------------------------------------------
 
         # --------------------------------------------------------------
 
         # --------------------------------------------------------------
         # We are about to return one layer up the rabbit hole
+        if lProfiler is not None:
+            lProfiler.exit()
         if self._verbosity > 1:
             print('<' * self._depth)
         self._depth -= 1
+        self._memo.setdefault((aPackage, aComponent, aDepFileName), []).append(self._includes)
         if lParentInclude:
-            lParentInclude.commands.append(self._includes)
+            self._attach(lParentInclude, self._includes)
             self._includes = lParentInclude
         # --------------------------------------------------------------
 
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _exitTopLevel(self):
+        '''
+        Uniquifies the commands and components lists and drops the parse-wide memos
+        '''
         # --------------------------------------------------------------
-        # If we are exiting the top-level, uniquify the commands list, keeping
-        # the order as defined in Dave's origianl voodoo
-        if self._depth == 0:
-            for i in self.commands:
-                lTemp = list()
-                for j in reversed(self.commands[i]):
-                    if j not in lTemp:
-                        lTemp.append(j)
-                lTemp.reverse()
-                self.commands[i] = lTemp
-
-            # If we are exiting the top-level, uniquify the component list
-            for lPkg in self.components:
-                lTemp = list()
-                lAdded = set()
-                for lCmp in self.components[lPkg]:
-                    if lCmp not in lAdded:
-                        lTemp.append(lCmp)
-                        lAdded.add(lCmp)
-                self.components[lPkg] = lTemp
+        # Uniquify the commands list, keeping the order as defined in
+        # Dave's origianl voodoo
+        for i in self.commands:
+            self.commands[i] = uniquify(self.commands[i])
+
+        # Uniquify the component list
+        for lPkg in self.components:
+            lTemp = list()
+            lAdded = set()
+            for lCmp in self.components[lPkg]:
+                if lCmp not in lAdded:
+                    lTemp.append(lCmp)
+                    lAdded.add(lCmp)
+            self.components[lPkg] = lTemp
         # --------------------------------------------------------------
 
+        self._previous = {}
+        self._unchanged = {}
+        self._resetMemos()
+        self._dependantsIndex = None
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+
+    # ----------------------------------------------------------------------------------------------------------------------------
+    def _resetMemos(self):
+        '''
+        Subtrees resolved, paths stat'ed and lines parsed during the parse,
+        shared with other parsers if a ParseMemo was provided
+        '''
+        lMemo = self._sharedMemo if self._sharedMemo is not None else ParseMemo()
+        self._memo = lMemo.subtrees
+        self._fsStamps = lMemo.stamps
+        self._lines = lMemo.lines
+
     # ----------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,137 @@
+from __future__ import print_function, absolute_import
+
+import time
+
+from collections import OrderedDict
+
+
+# ------------------------------------------------------------------------------
+class DepFileProfile(object):
+    """Parse statistics of a dep file
+
+    Attributes:
+        path      (str): absolute path of the dep file
+        package   (str): package the dep file belongs to
+        component (str): component the dep file belongs to
+        depth     (int): minimum include depth (1: top-level dep file)
+        parsed    (int): number of times the dep file was parsed
+        reused    (int): number of times a previously parsed subtree was reused instead
+        lines     (int): non-blank, non-comment lines processed
+        time    (float): wall time spent in the dep file, includes excluded
+        total   (float): wall time spent in the dep file, includes included
+        globs     (int): number of file expressions expanded
+        globTime  (float): time spent expanding file expressions
+        evals     (int): number of '?cond?' and '@var=' directives evaluated
+        evalTime  (float): time spent compiling and evaluating directives
+    """
+
+    kFields = (
+        'path', 'package', 'component', 'depth', 'parsed', 'reused', 'lines',
+        'time', 'total', 'globs', 'globTime', 'evals', 'evalTime'
+    )
+
+    __slots__ = kFields
+
+    # --------------------------------------------------------------
+    def __init__(self, aPath, aPackage, aComponent, aDepth):
+        self.path = aPath
+        self.package = aPackage
+        self.component = aComponent
+        self.depth = aDepth
+        self.parsed = 0
+        self.reused = 0
+        self.lines = 0
+        self.time = 0.
+        self.total = 0.
+        self.globs = 0
+        self.globTime = 0.
+        self.evals = 0
+        self.evalTime = 0.
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def toDict(self):
+        return OrderedDict((f, getattr(self, f)) for f in self.kFields)
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class DepFileProfiler(object):
+    """Instrumentation hook for DepFileParser, collecting per dep file statistics
+
+    The parser notifies the profiler when it enters and leaves a dep file,
+    processes a line, expands a file expression or evaluates a directive.
+    Times are measured with the profiler clock, wall time by default.
+
+    Attributes:
+        profiles (dict): DepFileProfile objects, by dep file path, in parse order
+    """
+
+    # --------------------------------------------------------------
+    def __init__(self, aClock=time.time):
+        super(DepFileProfiler, self).__init__()
+        self.clock = aClock
+        self.profiles = OrderedDict()
+        # Dep files being parsed: [profile, start time, time spent in includes]
+        self._stack = []
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _profile(self, aPath, aPackage, aComponent):
+        lDepth = len(self._stack) + 1
+        lProfile = self.profiles.get(aPath)
+        if lProfile is None:
+            lProfile = self.profiles[aPath] = DepFileProfile(aPath, aPackage, aComponent, lDepth)
+        else:
+            lProfile.depth = min(lProfile.depth, lDepth)
+        return lProfile
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def enter(self, aPath, aPackage, aComponent):
+        lProfile = self._profile(aPath, aPackage, aComponent)
+        lProfile.parsed += 1
+        self._stack.append([lProfile, self.clock(), 0.])
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def exit(self):
+        lProfile, lStart, lIncludes = self._stack.pop()
+        lElapsed = self.clock() - lStart
+        lProfile.total += lElapsed
+        lProfile.time += lElapsed - lIncludes
+        if self._stack:
+            self._stack[-1][2] += lElapsed
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def reuse(self, aPath, aPackage, aComponent):
+        self._profile(aPath, aPackage, aComponent).reused += 1
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def line(self):
+        self._stack[-1][0].lines += 1
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def glob(self, aElapsed):
+        lProfile = self._stack[-1][0]
+        lProfile.globs += 1
+        lProfile.globTime += aElapsed
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def directive(self, aElapsed):
+        lProfile = self._stack[-1][0]
+        lProfile.evals += 1
+        lProfile.evalTime += aElapsed
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def sorted(self, aKey='time'):
+        '''Returns the profiles by decreasing aKey'''
+        return sorted(self.profiles.values(), key=lambda p: getattr(p, aKey), reverse=True)
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,217 @@
+from __future__ import print_function, absolute_import
+
+import json
+
+from collections import OrderedDict
+
+from .DepFileParser import DepFile
+
+
+# ------------------------------------------------------------------------------
+class DepGraphExporter(object):
+    """Writes the resolved dependency graph of a DepFileParser in a machine-readable format
+
+    The graph is exported as a stream of records, in this order:
+
+    - header:    format version, toolset, source root directory and top-level dep file
+    - var:       dep file variables
+    - lib:       libraries
+    - component: resolved components, by package
+    - command:   commands by group, with package, component, library and flags
+    - depfile:   nodes of the include tree, with the ids of the dep files they include
+    - missing:   missing dependencies, with the dep file requesting them
+    - dependant: reverse map, from command targets to the dep files referring to them
+
+    Formats:
+        json:    a single object, with one list of records per record type
+        jsonl:   one JSON object per line, type in the 'type' field
+        msgpack: a sequence of maps, type in the 'type' field (requires msgpack)
+
+    Records are written as they are produced, the output is never held in memory.
+    """
+
+    kFormatVersion = 1
+    kFormats = ('json', 'jsonl', 'msgpack')
+
+    # Record types, and their section name in json format
+    kSections = OrderedDict([
+        ('header', 'header'),
+        ('var', 'vars'),
+        ('lib', 'libs'),
+        ('component', 'components'),
+        ('command', 'commands'),
+        ('depfile', 'depfiles'),
+        ('missing', 'missing'),
+        ('dependant', 'dependants'),
+    ])
+
+    # --------------------------------------------------------------
+    def __init__(self, aParser):
+        self.parser = aParser
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def records(self):
+        '''Yields (type, record) pairs for the whole graph'''
+        lParser = self.parser
+        lTop = lParser._includes
+
+        yield 'header', OrderedDict([
+            ('version', self.kFormatVersion),
+            ('toolset', lParser._toolset),
+            ('rootdir', lParser.pathMaker.rootdir),
+            ('top', lTop.path if lTop is not None else None),
+        ])
+
+        for lName in sorted(lParser.vars):
+            yield 'var', OrderedDict([('name', lName), ('value', lParser.vars[lName])])
+
+        # The parser records a library for each command using it
+        for lLib in OrderedDict.fromkeys(lParser.libs):
+            yield 'lib', OrderedDict([('name', lLib)])
+
+        for lPkg, lCmps in lParser.components.items():
+            for lCmp in lCmps:
+                yield 'component', OrderedDict([('package', lPkg), ('component', lCmp)])
+
+        for lGroup, lCmds in lParser.commands.items():
+            for lCmd in lCmds:
+                yield 'command', self._command(lGroup, lCmd)
+
+        for lRecord in self._depfiles(lTop):
+            yield 'depfile', lRecord
+
+        for lPath, lCmd, lPkg, lCmp, lDepFile in lParser.missing:
+            yield 'missing', OrderedDict([
+                ('path', lPath), ('cmd', lCmd), ('package', lPkg), ('component', lCmp), ('depfile', lDepFile)
+            ])
+
+        for lPath, lDepFiles in lParser._revDepMap.items():
+            yield 'dependant', OrderedDict([('path', lPath), ('depfiles', list(OrderedDict.fromkeys(lDepFiles)))])
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    @staticmethod
+    def _command(aGroup, aCmd):
+        return OrderedDict([
+            ('group', aGroup),
+            ('path', aCmd.FilePath),
+            ('package', aCmd.Package),
+            ('component', aCmd.Component),
+            ('lib', aCmd.Lib),
+            ('flags', aCmd.flags()),
+        ])
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    @staticmethod
+    def _depfiles(aTop):
+        '''
+        Yields one record per include tree node, in depth-first order.
+        Subtrees shared by several includes are written once, and referred to by id.
+        '''
+        if aTop is None:
+            return
+
+        lIds = {}
+        for lNode in aTop.nodes():
+            lIds.setdefault(id(lNode), len(lIds))
+
+        lWritten = set()
+        for lNode in aTop.nodes():
+            if id(lNode) in lWritten:
+                continue
+            lWritten.add(id(lNode))
+
+            lIncludes = []
+            lCommands = []
+            lMissing = []
+            for lEntry in lNode.commands:
+                if isinstance(lEntry, DepFile):
+                    lIncludes.append(lIds[id(lEntry)])
+                elif len(lEntry) == 2:
+                    lCommands.append([lEntry[0], lEntry[1].FilePath])
+                elif len(lEntry) > 2:
+                    lMissing.append(lEntry[0])
+
+            yield OrderedDict([
+                ('id', lIds[id(lNode)]),
+                ('path', lNode.path),
+                ('package', lNode.pkg),
+                ('component', lNode.cmp),
+                ('dep', lNode.dep),
+                ('includes', lIncludes),
+                ('commands', lCommands),
+                ('missing', lMissing),
+            ])
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def write(self, aStream, aFormat='json'):
+        '''
+        Writes the graph to aStream, a text stream for json and jsonl, a binary one for msgpack
+        '''
+        if aFormat == 'json':
+            self._writeJson(aStream)
+        elif aFormat == 'jsonl':
+            self._writeJsonLines(aStream)
+        elif aFormat == 'msgpack':
+            self._writeMsgPack(aStream)
+        else:
+            raise ValueError('Unknown export format {}, expected one of {}'.format(aFormat, ', '.join(self.kFormats)))
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _writeJson(self, aStream):
+        lTypes = list(self.kSections)
+        # Index of the section being written, sections without records are written empty
+        lCurrent = 0
+        for lType, lRecord in self.records():
+            lText = json.dumps(lRecord, default=str)
+            if lType == 'header':
+                aStream.write('{\n"header": ' + lText)
+                continue
+
+            lIndex = lTypes.index(lType)
+            if lIndex == lCurrent:
+                aStream.write(',\n')
+            else:
+                if lCurrent:
+                    aStream.write('\n]')
+                for lEmpty in lTypes[lCurrent + 1:lIndex]:
+                    aStream.write(',\n"{}": []'.format(self.kSections[lEmpty]))
+                aStream.write(',\n"{}": [\n'.format(self.kSections[lType]))
+                lCurrent = lIndex
+            aStream.write(lText)
+
+        if lCurrent:
+            aStream.write('\n]')
+        for lEmpty in lTypes[lCurrent + 1:]:
+            aStream.write(',\n"{}": []'.format(self.kSections[lEmpty]))
+        aStream.write('\n}\n')
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _writeJsonLines(self, aStream):
+        for lType, lRecord in self.records():
+            aStream.write(json.dumps(self._typed(lType, lRecord), default=str))
+            aStream.write('\n')
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _writeMsgPack(self, aStream):
+        import msgpack
+
+        lPacker = msgpack.Packer(default=str)
+        for lType, lRecord in self.records():
+            aStream.write(lPacker.pack(self._typed(lType, lRecord)))
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    @staticmethod
+    def _typed(aType, aRecord):
+        lRecord = OrderedDict([('type', aType)])
+        lRecord.update(aRecord)
+        return lRecord
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,192 @@
+from __future__ import print_function, absolute_import
+
+import os
+import fnmatch
+import glob
+
+from collections import OrderedDict
+from os.path import join, split, normpath
+
+
+# Entry kind of symbolic links whose target does not exist
+kDangling = 'dangling'
+
+
+# ------------------------------------------------------------------------------
+def _kind(aPath):
+    '''Entry kind of a path, following symlinks'''
+    if os.path.isdir(aPath):
+        return True
+    return False if os.path.exists(aPath) else kDangling
+
+
+# ------------------------------------------------------------------------------
+def _scan(aDir):
+    '''Lists a directory in a single pass
+
+    Returns:
+        OrderedDict: entry name -> True for directories (symlinks followed), kDangling for
+            broken symlinks, False otherwise. None if aDir is not a readable directory
+    '''
+    try:
+        lScandir = os.scandir
+    except AttributeError:
+        # Python 2: one extra stat per entry
+        try:
+            return OrderedDict((n, _kind(join(aDir, n))) for n in os.listdir(aDir))
+        except OSError:
+            return None
+
+    lEntries = OrderedDict()
+    try:
+        for lEntry in lScandir(aDir):
+            try:
+                # Only symlinks need an extra stat, to find whether their target exists
+                lEntries[lEntry.name] = _kind(lEntry.path) if lEntry.is_symlink() else lEntry.is_dir()
+            except OSError:
+                lEntries[lEntry.name] = False
+    except OSError:
+        return None
+    return lEntries
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class FileSystemIndex(object):
+    """In-memory snapshot of a directory tree
+
+    Answers exists, isdir, listdir and glob queries from directory listings
+    read once with os.scandir. Directories are listed on first access, or all
+    at once with `build`. The index is not updated when the tree changes on
+    disk: `refresh` drops the listings of a directory (and its subdirectories),
+    which are read again on the next query.
+
+    Attributes:
+        rootdir (str): root of the tree `build` walks
+    """
+
+    # --------------------------------------------------------------
+    def __init__(self, aRootDir):
+        self.rootdir = normpath(aRootDir)
+        self._dirs = {}
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def __len__(self):
+        return len(self._dirs)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _entries(self, aDir):
+        aDir = normpath(aDir)
+        try:
+            return self._dirs[aDir]
+        except KeyError:
+            lEntries = self._dirs[aDir] = _scan(aDir)
+            return lEntries
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def build(self):
+        '''Lists the whole tree below rootdir
+
+        Hidden directories (e.g. .git) are not descended into, they are
+        listed on demand if queried.
+        '''
+        lStack = [self.rootdir]
+        while lStack:
+            lDir = lStack.pop()
+            lEntries = self._dirs[lDir] = _scan(lDir)
+            if not lEntries:
+                continue
+            lStack.extend(join(lDir, n) for n, d in lEntries.items() if d is True and n[0] != '.')
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def refresh(self, aDir=None):
+        '''Drops the listings of aDir and of its subdirectories, or all of them
+
+        Args:
+            aDir (str): directory to refresh. Default: the whole index
+        '''
+        if aDir is None:
+            self._dirs = {}
+            return
+
+        aDir = normpath(aDir)
+        lPrefix = join(aDir, '')
+        for lDir in [d for d in self._dirs if d == aDir or d.startswith(lPrefix)]:
+            del self._dirs[lDir]
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def listdir(self, aDir):
+        '''Same as os.listdir'''
+        lEntries = self._entries(aDir)
+        if lEntries is None:
+            raise OSError("Directory {} does not exist".format(aDir))
+        return list(lEntries)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _lookup(self, aPath):
+        lDir, lName = split(normpath(aPath))
+        if not lName:
+            # Filesystem root
+            return os.path.isdir(lDir)
+
+        lEntries = self._entries(lDir)
+        return lEntries.get(lName) if lEntries is not None else None
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def exists(self, aPath):
+        '''Same as os.path.exists: broken symlinks do not exist'''
+        return self._lookup(aPath) not in (None, kDangling)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def lexists(self, aPath):
+        '''Same as os.path.lexists'''
+        return self._lookup(aPath) is not None
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def isdir(self, aPath):
+        '''Same as os.path.isdir'''
+        return self._lookup(aPath) is True
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def glob(self, aPathExpr):
+        '''Same as glob.glob, for absolute expressions'''
+        lDirExpr, lNameExpr = split(aPathExpr)
+
+        if not glob.has_magic(aPathExpr):
+            if lNameExpr:
+                return [aPathExpr] if self.lexists(aPathExpr) else []
+            return [aPathExpr] if self.isdir(lDirExpr) else []
+
+        if lDirExpr != aPathExpr and glob.has_magic(lDirExpr):
+            lDirs = self.glob(lDirExpr)
+        else:
+            lDirs = [lDirExpr]
+
+        lPaths = []
+        for lDir in lDirs:
+            if not glob.has_magic(lNameExpr):
+                # Magic in the directory part only
+                if (self.lexists(join(lDir, lNameExpr)) if lNameExpr else self.isdir(lDir)):
+                    lPaths.append(join(lDir, lNameExpr))
+                continue
+
+            lEntries = self._entries(lDir)
+            if not lEntries:
+                continue
+            lNames = list(lEntries)
+            if lNameExpr[0] != '.':
+                lNames = [n for n in lNames if n[0] != '.']
+            lPaths.extend(join(lDir, n) for n in fnmatch.filter(lNames, lNameExpr))
+        return lPaths
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
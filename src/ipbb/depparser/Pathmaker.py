@@ -1,6 +1,13 @@
 from __future__ import print_function, absolute_import
 import os
 
+try:
+    from functools import lru_cache
+except ImportError:
+    # Python 2: paths are built on every call
+    def lru_cache(maxsize=128):
+        return lambda aFunc: aFunc
+
 # --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
@@ -21,10 +28,17 @@ class Pathmaker(object):
         # , "setup": "tcl"}
     }
 
+    # Maximum number of paths memoized by getPath
+    kPathCacheSize = 0x10000
+
     # --------------------------------------------------------------
-    def __init__(self, rootdir, verbosity=0):
+    def __init__(self, rootdir, verbosity=0, fsindex=None):
         self.rootdir = rootdir
         self.verbosity = verbosity
+        # Optional FileSystemIndex, answering filesystem queries in place of os/glob
+        self.fsindex = fsindex
+        # Paths are built once per argument tuple, the cache is bound to this rootdir
+        self._buildPath = lru_cache(maxsize=self.kPathCacheSize)(self._buildPath)
 
         if self.verbosity > 3:
             print("+++ Pathmaker init", rootdir)
@@ -32,17 +46,55 @@ class Pathmaker(object):
 
     # --------------------------------------------------------------
     def getPackagePath(self, aPackage):
-        return os.path.normpath(os.path.join(self.rootdir, aPackage))
+        return self._buildPath(aPackage, None, None, None, None)
     # --------------------------------------------------------------
 
     # --------------------------------------------------------------
     def packageExists(self, aPackage):
-        return os.path.exists(self.getPackagePath(aPackage))
+        return self.exists(self.getPackagePath(aPackage))
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def exists(self, aPath):
+        if self.fsindex is not None:
+            return self.fsindex.exists(aPath)
+        return os.path.exists(aPath)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def isdir(self, aPath):
+        if self.fsindex is not None:
+            return self.fsindex.isdir(aPath)
+        return os.path.isdir(aPath)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def listdir(self, aPath):
+        if self.fsindex is not None:
+            return self.fsindex.listdir(aPath)
+        return os.listdir(aPath)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def expand(self, aPathExpr):
+        if self.fsindex is not None:
+            return self.fsindex.glob(aPathExpr)
+
+        import glob
+        return glob.glob(aPathExpr)
     # --------------------------------------------------------------
 
     # --------------------------------------------------------------
     def getPath(self, package, component=None, command=None, name=None, cd=None):
 
+        if self.verbosity > 2:
+            print('+++ Pathmaker', package, component, command, name, cd)
+        return self._buildPath(package, component, command, name, cd)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _buildPath(self, package, component, command, name, cd):
+
         # path = [package, component]
         path = [package]
 
@@ -58,11 +110,7 @@ class Pathmaker(object):
         if name:
             path.append(name)
 
-        lPath = os.path.normpath(os.path.join(self.rootdir, *path))
-
-        if self.verbosity > 2:
-            print('+++ Pathmaker', package, component, command, name, cd)
-        return lPath
+        return os.path.normpath(os.path.join(self.rootdir, *path))
     # --------------------------------------------------------------
 
     # --------------------------------------------------------------
@@ -72,13 +120,12 @@ class Pathmaker(object):
 
     # --------------------------------------------------------------
     def glob(self, package, component, command, fileexpr, cd=None):
-        import glob
 
         lPathExpr = self.getPath(package, component, command, fileexpr, cd=cd)
         lKindPath = self.getPath(package, component, command, cd=cd)
 
         # Expand the expression
-        lFilePaths = glob.glob(lPathExpr)
+        lFilePaths = self.expand(lPathExpr)
 
         # Calculate the relative path and pair it up with the absolute path
         lFileList = [(os.path.relpath(lPath2, lKindPath), lPath2)
@@ -0,0 +1,427 @@
+from __future__ import print_function, absolute_import
+
+import collections
+import fnmatch
+import hashlib
+import mmap
+import os
+import pickle
+import stat
+import time
+
+from binascii import hexlify, unhexlify
+from os.path import isdir, islink, exists, dirname, join
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport: files are hashed serially
+    ThreadPoolExecutor = None
+
+
+# Domain separation tags of leaf (file) and folder entries in HashTree digests
+kLeafTag = b'\x00'
+kFolderTag = b'\x01'
+
+# Default read size
+kChunkSize = 0x10000
+
+# Files from this size up are hashed from a memory map
+kMmapThreshold = 0x1000000
+
+# Algorithms available for project hashing: those with fixed length digests, guaranteed on all platforms
+kAlgorithms = tuple(sorted(
+    a for a in getattr(hashlib, 'algorithms_guaranteed', ('md5', 'sha1', 'sha224', 'sha256', 'sha384', 'sha512'))
+    if not a.startswith('shake')
+))
+
+
+# ------------------------------------------------------------------------------
+def defaultWorkers():
+    '''Default number of hashing threads'''
+    return min(8, os.cpu_count() or 1) if hasattr(os, 'cpu_count') else 1
+
+
+# ------------------------------------------------------------------------------
+def _entries(aDir):
+    '''Sorted (name, is directory) pairs of the entries of a folder, symlinks are not followed'''
+    if hasattr(os, 'scandir'):
+        return sorted((e.name, e.is_dir(follow_symlinks=False)) for e in os.scandir(aDir))
+    return sorted((n, isdir(join(aDir, n)) and not islink(join(aDir, n))) for n in os.listdir(aDir))
+
+
+# ------------------------------------------------------------------------------
+def walkFiles(aDir, aIgnore=()):
+    '''Lists the files below a folder, in a deterministic order
+
+    Entries are visited depth first, by name. Files and folders matching
+    any of the aIgnore glob patterns, by name or by path relative to
+    aDir, are skipped.
+
+    Returns:
+        list: file paths relative to aDir
+    '''
+    def ignored(aName, aRelPath):
+        return any(fnmatch.fnmatch(aName, p) or fnmatch.fnmatch(aRelPath, p) for p in aIgnore)
+
+    lFiles = []
+    # Folders being listed, with an iterator on their remaining entries
+    lStack = [('', iter(_entries(aDir)))]
+    while lStack:
+        lRelDir, lEntries = lStack[-1]
+        lEntry = next(lEntries, None)
+        if lEntry is None:
+            lStack.pop()
+            continue
+
+        lName, lIsDir = lEntry
+        lRelPath = join(lRelDir, lName)
+        if ignored(lName, lRelPath):
+            continue
+        if lIsDir:
+            lStack.append((lRelPath, iter(_entries(join(aDir, lRelPath)))))
+        else:
+            lFiles.append(lRelPath)
+    return lFiles
+
+
+# ------------------------------------------------------------------------------
+def expandPaths(aPaths, aIgnore=(), aWorkers=1):
+    '''Expands folders into the files they contain
+
+    Folders are listed concurrently with more than one worker.
+
+    Returns:
+        list: for each path, in order, a list of (path relative to it, file
+            path) pairs for folders, [(None, path)] otherwise
+    '''
+    lDirs = [p for p in aPaths if isdir(p)]
+    if aWorkers > 1 and ThreadPoolExecutor is not None and len(lDirs) > 1:
+        with ThreadPoolExecutor(max_workers=aWorkers) as lPool:
+            lListings = dict(zip(lDirs, lPool.map(lambda d: walkFiles(d, aIgnore), lDirs)))
+    else:
+        lListings = {d: walkFiles(d, aIgnore) for d in lDirs}
+
+    return [
+        [(f, join(p, f)) for f in lListings[p]] if p in lListings else [(None, p)]
+        for p in aPaths
+    ]
+
+
+# ------------------------------------------------------------------------------
+class FileHashCache(object):
+    """Persistent store of file digests
+
+    A digest is reused as long as the file inode, size and modification
+    time are the same as when it was computed, for the same algorithm.
+
+    Attributes:
+        path     (str): path to the cache file
+        entries (dict): (file path, algorithm) -> ((inode, size, mtime_ns), digest)
+    """
+
+    kFormatVersion = 1
+
+    # Files modified less than kRacyInterval seconds before being hashed can
+    # change again without their signature changing: their digest is not stored
+    kRacyInterval = 2.
+
+    # --------------------------------------------------------------
+    def __init__(self, aPath):
+        self.path = aPath
+        self.entries = {}
+        self._modified = False
+        self.load()
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def load(self):
+        try:
+            with open(self.path, 'rb') as lFile:
+                lVersion, lEntries = pickle.load(lFile)
+        except Exception:
+            return
+
+        if lVersion == self.kFormatVersion:
+            self.entries = lEntries
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def store(self):
+        '''Saves the cache to disk, if modified. Failures are not fatal.'''
+        if not self._modified:
+            return
+
+        lTmpPath = '{}.tmp{}'.format(self.path, os.getpid())
+        try:
+            if not exists(dirname(self.path)):
+                os.makedirs(dirname(self.path))
+            with open(lTmpPath, 'wb') as lFile:
+                pickle.dump((self.kFormatVersion, self.entries), lFile, pickle.HIGHEST_PROTOCOL)
+            os.rename(lTmpPath, self.path)
+            self._modified = False
+        except (IOError, OSError):
+            if exists(lTmpPath):
+                os.remove(lTmpPath)
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    @staticmethod
+    def signature(aStat):
+        return (aStat.st_ino, aStat.st_size, getattr(aStat, 'st_mtime_ns', aStat.st_mtime))
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def lookup(self, aPath, aAlgoName, aStat):
+        '''Returns the cached digest of a file, None if missing or outdated'''
+        lEntry = self.entries.get((aPath, aAlgoName))
+        if lEntry is None or lEntry[0] != self.signature(aStat):
+            return None
+        return lEntry[1]
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def update(self, aPath, aAlgoName, aStat, aDigest, aHashTime):
+        if aHashTime - aStat.st_mtime < self.kRacyInterval:
+            return
+        self.entries[aPath, aAlgoName] = (self.signature(aStat), aDigest)
+        self._modified = True
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def updateFromFile(aHash, aFile, aSize, aChunkSize=kChunkSize, aMmapThreshold=kMmapThreshold):
+    '''Feeds the content of an open file to a hash, without copies
+
+    Files of aMmapThreshold bytes or more are hashed from a read-only
+    memory map, in one call. Smaller files, and files that cannot be
+    mapped, are read into a single reused buffer.
+    '''
+    if aMmapThreshold is not None and aSize >= aMmapThreshold:
+        try:
+            lMap = mmap.mmap(aFile.fileno(), 0, access=mmap.ACCESS_READ)
+        except (mmap.error, ValueError, OSError):
+            pass
+        else:
+            try:
+                aHash.update(lMap)
+            finally:
+                lMap.close()
+            return
+
+    lBuffer = bytearray(aChunkSize)
+    lView = memoryview(lBuffer)
+    while True:
+        lSize = aFile.readinto(lBuffer)
+        if not lSize:
+            break
+        aHash.update(lView[:lSize])
+
+
+# ------------------------------------------------------------------------------
+def hashFile(aPath, aChunkSize=kChunkSize, aAlgo=hashlib.sha1, aCache=None, aVerify=False, aMmapThreshold=kMmapThreshold):
+    '''Computes the digest of a file, unless cached
+
+    Returns:
+        tuple: (digest, cached digest, stat, time), where time is when the
+            file was hashed, None if the digest comes from the cache. Paths
+            that are not files have the digest of no content, and no stat.
+    '''
+    lHash = aAlgo()
+    try:
+        lStat = os.stat(aPath)
+    except OSError:
+        return lHash.digest(), None, None, None
+    if not stat.S_ISREG(lStat.st_mode):
+        return lHash.digest(), None, None, None
+
+    lCached = aCache.lookup(aPath, lHash.name, lStat) if aCache is not None else None
+    if lCached is not None and not aVerify:
+        return lCached, lCached, lStat, None
+
+    lTime = time.time()
+    with open(aPath, "rb") as f:
+        updateFromFile(lHash, f, lStat.st_size, aChunkSize, aMmapThreshold)
+    return lHash.digest(), lCached, lStat, lTime
+
+
+# ------------------------------------------------------------------------------
+def iterHashes(aPaths, aChunkSize=kChunkSize, aAlgo=hashlib.sha1, aWorkers=1, aCache=None, aVerify=False, aMmapThreshold=kMmapThreshold):
+    '''Computes the digests of a sequence of files
+
+    With more than one worker, files are hashed on a thread pool (file
+    reads and hashlib release the GIL). Digests are returned in order
+    regardless. Files whose inode, size and modification time match their
+    aCache entry are not read, unless aVerify is set. The cache is
+    updated with the new digests.
+
+    Args:
+        aPaths (iterable): file paths
+        aChunkSize (int): read size
+        aAlgo (callable): hash constructor
+        aWorkers (int): number of threads
+        aCache (FileHashCache): digest cache, optional
+        aVerify (bool): hash all files, reporting cached digests that differ
+        aMmapThreshold (int): size from which files are memory mapped, None to never map
+
+    Yields:
+        tuple: (path, digest, stale) in order, where stale is the cached
+            digest if it did not match the file content (verify mode only)
+    '''
+    lAlgoName = aAlgo().name
+
+    def complete(aPath, aResult):
+        lDigest, lCached, lStat, lTime = aResult
+        if aCache is not None and lTime is not None and lDigest != lCached:
+            aCache.update(aPath, lAlgoName, lStat, lDigest, lTime)
+        return aPath, lDigest, lCached if lCached not in (None, lDigest) else None
+
+    if aWorkers <= 1 or ThreadPoolExecutor is None:
+        for lPath in aPaths:
+            yield complete(lPath, hashFile(lPath, aChunkSize, aAlgo, aCache, aVerify, aMmapThreshold))
+        return
+
+    with ThreadPoolExecutor(max_workers=aWorkers) as lPool:
+        lPending = collections.deque()
+        for lPath in aPaths:
+            lPending.append((lPath, lPool.submit(hashFile, lPath, aChunkSize, aAlgo, aCache, aVerify, aMmapThreshold)))
+            if len(lPending) >= 2 * aWorkers:
+                lPath, lFuture = lPending.popleft()
+                yield complete(lPath, lFuture.result())
+
+        while lPending:
+            lPath, lFuture = lPending.popleft()
+            yield complete(lPath, lFuture.result())
+
+
+# ------------------------------------------------------------------------------
+class HashTree(object):
+    """Merkle tree of digests
+
+    Leaves hold file digests. The digest of a folder is the hash of the
+    kinds, names and digests of its children, in insertion order, and is
+    computed on demand. Folder data and child entries are tagged with
+    kFolderTag or kLeafTag, so that no folder hashes like a file. Setting a leaf digest invalidates its ancestors
+    only: after a change, the root digest is recomputed in O(changed).
+
+    Attributes:
+        name      (str): node name
+        children (dict): child nodes, by name, in insertion order
+        leaf      (bool): True if the node holds a file digest
+    """
+    __slots__ = ('name', 'children', 'parent', 'algo', 'leaf', '_digest')
+
+    # --------------------------------------------------------------
+    def __init__(self, aName, aAlgo=hashlib.sha1, aParent=None):
+        self.name = aName
+        self.children = collections.OrderedDict()
+        self.parent = aParent
+        self.algo = aAlgo
+        self.leaf = False
+        self._digest = None
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def node(self, *aNames):
+        '''Returns the descendant at the end of a path of names, creating it if needed'''
+        lNode = self
+        for lName in aNames:
+            lChild = lNode.children.get(lName)
+            if lChild is None:
+                lChild = lNode.children[lName] = HashTree(lName, self.algo, lNode)
+                lNode._invalidate()
+            lNode = lChild
+        return lNode
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def _invalidate(self):
+        lNode = self
+        while lNode is not None and lNode._digest is not None:
+            lNode._digest = None
+            lNode = lNode.parent
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def setDigest(self, aDigest):
+        '''Sets the digest of a leaf'''
+        if aDigest == self._digest:
+            return
+        if self.parent is not None:
+            self.parent._invalidate()
+        self.leaf = True
+        self._digest = aDigest
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def digest(self):
+        if self._digest is None:
+            lHash = self.algo()
+            lHash.update(kFolderTag)
+            for lName, lChild in self.children.items():
+                lHash.update((kLeafTag if lChild.leaf else kFolderTag) + lName.encode('utf-8') + b'\0')
+                lHash.update(lChild.digest())
+            self._digest = lHash.digest()
+        return self._digest
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def hexdigest(self):
+        return hexlify(self.digest()).decode()
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def walk(self, aDepth=None, aPath=()):
+        '''Yields (path, node) pairs, depth first, down to aDepth levels below this node'''
+        yield aPath, self
+        if aDepth == 0:
+            return
+        for lName, lChild in self.children.items():
+            for lPair in lChild.walk(aDepth - 1 if aDepth is not None else None, aPath + (lName,)):
+                yield lPair
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def diff(self, aOther, aPath=()):
+        '''
+        Yields the topmost subtrees that differ from aOther, as (path, status)
+        pairs, where status is 'changed', 'added' or 'removed'
+        '''
+        if self.digest() == aOther.digest():
+            return
+        if self.leaf or aOther.leaf:
+            yield aPath, 'changed'
+            return
+
+        for lName, lChild in self.children.items():
+            lOtherChild = aOther.children.get(lName)
+            if lOtherChild is None:
+                yield aPath + (lName,), 'added'
+            else:
+                for lPair in lChild.diff(lOtherChild, aPath + (lName,)):
+                    yield lPair
+        for lName in aOther.children:
+            if lName not in self.children:
+                yield aPath + (lName,), 'removed'
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    def toDict(self):
+        lDict = collections.OrderedDict([('name', self.name), ('digest', self.hexdigest())])
+        if not self.leaf:
+            lDict['children'] = [c.toDict() for c in self.children.values()]
+        return lDict
+    # --------------------------------------------------------------
+
+    # --------------------------------------------------------------
+    @classmethod
+    def fromDict(cls, aDict, aAlgo=hashlib.sha1, aParent=None):
+        lNode = cls(aDict['name'], aAlgo, aParent)
+        for lChild in aDict.get('children', []):
+            lNode.children[lChild['name']] = cls.fromDict(lChild, aAlgo, lNode)
+        lNode.leaf = 'children' not in aDict
+        lNode._digest = unhexlify(aDict['digest'])
+        return lNode
+    # --------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -33,6 +33,9 @@ from ctypes import cdll
 # Constant taken from http://linux.die.net/include/linux/prctl.h
 PR_SET_PDEATHSIG = 1
 
+# Prefix of the sentinel lines delimiting the output of batched commands
+kBatchMarker = u'@ipbb@'
+
 
 class PrCtlError(Exception):
     pass
@@ -199,6 +202,10 @@ class VivadoOutputFormatter(OutputFormatter):
             self.pendingchars = ''
 
         for lLine in lines:
+            # Sentinels of batched commands are not for human eyes
+            if lLine.startswith(kBatchMarker):
+                continue
+
             lColor = None
             if lLine.startswith('INFO:'):
                 lColor = kBlue
@@ -251,12 +258,29 @@ class VivadoConsole(object):
     __reCharBackspace = re.compile(u'.\x08')
     __reError = re.compile(u'^ERROR:')
     __reCriticalWarning = re.compile(u'^CRITICAL WARNING:')
+    __reBatchMarker = re.compile(u'^' + kBatchMarker + r' (begin|error|done)(?: (\d+))?$')
+    __reTclSpecial = re.compile(r'([\\\[\]{}$";\s])')
     __instances = set()
     __promptMap = {
         'vivado': u'Vivado%\s',
         'vivado_lab': u'vivado_lab%\s'
     }
 
+    # Single line TCL loop running a list of (index, command) pairs at global level.
+    # The output of each command follows its 'begin' sentinel, the first failing
+    # command prints an 'error' sentinel followed by the TCL error message, and stops the loop.
+    __batchTemplate = (
+        u'foreach {{__ipbb_i __ipbb_cmd}} {{{cmds}}} {{'
+        u'puts "{marker} begin $__ipbb_i"; '
+        u'if {{[catch {{uplevel #0 $__ipbb_cmd}} __ipbb_res] == 1}} '
+        u'{{puts "{marker} error $__ipbb_i"; puts $__ipbb_res; break}}; '
+        u'if {{$__ipbb_res ne ""}} {{puts $__ipbb_res}}'
+        u'}}; puts "{marker} done"; unset -nocomplain __ipbb_i __ipbb_cmd __ipbb_res'
+    )
+
+    # Characters of commands per batch line, keeping lines within the terminal line buffer
+    kMaxBatchLineLength = 3500
+
     # --------------------------------------------------------------
     @classmethod
     def killAllInstances(cls):
@@ -483,6 +507,111 @@ class VivadoConsole(object):
             lOutput.extend(self.execute(lCmd, aMaxLen))
         return lOutput
 
+    # --------------------------------------------------------------
+    def executeBatch(self, aCmds):
+        """Executes a list of commands, sending them in as few lines as possible
+
+        The commands are wrapped in a TCL loop, one line per batch of up to
+        kMaxBatchLineLength characters of commands, which prints sentinel lines around the
+        output of each command. The output is split per command on the way back.
+        Errors and critical warnings are attributed to the command which printed
+        them. The first command raising a TCL error stops the batch.
+
+        Args:
+            aCmds (list): Commands to execute
+
+        Returns:
+            list: Output lines of each command, including their return value
+
+        Raises:
+            VivadoConsoleError: for the first command reporting errors (or critical
+                warnings, if stopOnCWarnings is set). Unlike executeMany, the
+                commands following it in the same line may already have run,
+                unless the error was raised as a TCL error.
+        """
+        if not isinstance(aCmds, list):
+            raise TypeError('expected list')
+
+        for lCmd in aCmds:
+            if not isinstance(lCmd, six.string_types):
+                raise TypeError('expected string, found '+str(type(lCmd)))
+
+            if lCmd.count('\n') != 0:
+                raise ValueError('Format error. Newline not allowed in commands')
+
+        lOutput = []
+        for lFirst, lCount, lScript in self._batchScripts(aCmds, self.kMaxBatchLineLength):
+            self.__send(lScript)
+            lBuffer, _, _ = self.__expectPrompt(None)
+
+            lResults = self._splitBatchOutput(lBuffer)
+            if len(lResults) != lCount and (not lResults or lResults[-1][1] is None):
+                raise RuntimeError(
+                    'Batch output incomplete: {} commands sent, {} reported'.format(lCount, len(lResults))
+                )
+
+            for lIndex, (lLines, lTclError) in enumerate(lResults, lFirst):
+                lOutput.append(lLines)
+
+                lErrors = [lLine for lLine in lLines if self.__reError.match(lLine)]
+                lCriticalWarnings = [lLine for lLine in lLines if self.__reCriticalWarning.match(lLine)]
+                if lTclError is not None and not lErrors:
+                    lErrors = lTclError
+
+                if lTclError is not None or lErrors or (self._stopOnCWarnings and lCriticalWarnings):
+                    raise VivadoConsoleError(aCmds[lIndex], lErrors, lCriticalWarnings)
+
+        return lOutput
+
+    # --------------------------------------------------------------
+    @classmethod
+    def _batchScripts(cls, aCmds, aMaxLength):
+        """Yields (index of the first command, number of commands, TCL line) for each batch"""
+        lItems = []
+        lLength = 0
+        lFirst = 0
+        for lIndex, lCmd in enumerate(aCmds):
+            # Backslash-quoted list element, whatever the braces and brackets in the command
+            lItem = u'{} {}'.format(lIndex, cls.__reTclSpecial.sub(r'\\\1', lCmd) if lCmd else u'{}')
+            if lItems and lLength + len(lItem) > aMaxLength:
+                yield lFirst, len(lItems), cls.__batchTemplate.format(cmds=u' '.join(lItems), marker=kBatchMarker)
+                lItems = []
+                lLength = 0
+                lFirst = lIndex
+            lItems.append(lItem)
+            lLength += len(lItem) + 1
+
+        if lItems:
+            yield lFirst, len(lItems), cls.__batchTemplate.format(cmds=u' '.join(lItems), marker=kBatchMarker)
+
+    # --------------------------------------------------------------
+    @classmethod
+    def _splitBatchOutput(cls, aLines):
+        """Splits the output of a batch line into (output lines, TCL error lines or None), one per command run"""
+        lResults = []
+        lCurrent = None
+        for lLine in aLines:
+            if lLine is None:
+                continue
+
+            m = cls.__reBatchMarker.match(lLine.rstrip())
+            if m is None:
+                if lCurrent is not None:
+                    lCurrent.append(lLine)
+                continue
+
+            lTag = m.group(1)
+            if lTag == 'begin':
+                lCurrent = []
+                lResults.append([lCurrent, None])
+            elif lTag == 'error':
+                lCurrent = []
+                lResults[-1][1] = lCurrent
+            else:
+                lCurrent = None
+
+        return [tuple(r) for r in lResults]
+
     # --------------------------------------------------------------
     def changeMsgSeverity(self, aIds, aSeverity):
         """Change the severity of a single/multiple messages
@@ -492,7 +621,7 @@ class VivadoConsole(object):
             aSeverity (str): Target severity
         """
         lIds = aIds if isinstance(aIds, list) else [aIds]
-        self.executeMany(['set_msg_config -id {{{}}} -new_severity {{{}}}'.format(i, aSeverity) for i in lIds])
+        self.executeBatch(['set_msg_config -id {{{}}} -new_severity {{{}}}'.format(i, aSeverity) for i in lIds])
 
 
 # -------------------------------------------------------------------------
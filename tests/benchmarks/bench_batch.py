@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Multi-project dep file parsing benchmark
+
+Builds a synthetic work area where a number of top-level dep files share
+most of their components, then times parsing all of them with isolated
+DepFileParsers and with parsers sharing a ParseMemo, as 'dep batch' does.
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from os.path import join
+
+from ipbb.depparser.Pathmaker import Pathmaker
+from ipbb.depparser.FileSystemIndex import FileSystemIndex
+from ipbb.depparser.DepFileParser import DepFileParser, ParseMemo
+
+
+# ------------------------------------------------------------------------------
+def makeArea(aRoot, aProjects, aComponents, aShared, aLines):
+    lShared = int(aComponents * aShared)
+
+    def makeComponent(aName):
+        lHdl = join(aRoot, 'pkg', aName, 'firmware', 'hdl')
+        lCfg = join(aRoot, 'pkg', aName, 'firmware', 'cfg')
+        os.makedirs(lHdl)
+        os.makedirs(lCfg)
+        with open(join(lCfg, aName + '.dep'), 'w') as f:
+            for l in range(aLines):
+                lSrc = 'src{}.vhd'.format(l)
+                open(join(lHdl, lSrc), 'w').close()
+                f.write('?toolset == "Vivado"? src {}\n'.format(lSrc) if l % 5 == 0 else 'src {}\n'.format(lSrc))
+
+    for c in range(lShared):
+        makeComponent('shared{}'.format(c))
+
+    lTops = []
+    for p in range(aProjects):
+        lIncludes = ['include -c shared{}'.format(c) for c in range(lShared)]
+        for c in range(aComponents - lShared):
+            lName = 'own{}_{}'.format(p, c)
+            makeComponent(lName)
+            lIncludes.append('include -c {}'.format(lName))
+
+        lTop = 'top{}'.format(p)
+        os.makedirs(join(aRoot, 'pkg', lTop, 'firmware', 'cfg'))
+        with open(join(aRoot, 'pkg', lTop, 'firmware', 'cfg', 'top.dep'), 'w') as f:
+            f.write('\n'.join(lIncludes) + '\n')
+        lTops.append(lTop)
+    return lTops
+
+
+# ------------------------------------------------------------------------------
+def timeBatch(aRoot, aTops, aShared):
+    lStart = time.time()
+    lPathmaker = Pathmaker(aRoot, fsindex=FileSystemIndex(aRoot) if aShared else None)
+    lMemo = ParseMemo() if aShared else None
+    lCommands = []
+    for lTop in aTops:
+        lParser = DepFileParser('vivado', lPathmaker, aMemo=lMemo)
+        lParser.parse('pkg', lTop, 'top.dep')
+        lCommands.append(lParser.commands)
+    return time.time() - lStart, lCommands
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-p', '--projects', type=int, default=30)
+    parser.add_argument('-c', '--components', type=int, default=50)
+    parser.add_argument('-s', '--shared', type=float, default=0.8, help='Fraction of components shared by all projects')
+    parser.add_argument('-l', '--lines', type=int, default=40, help='Lines per component dep file')
+    args = parser.parse_args()
+
+    lRoot = tempfile.mkdtemp()
+    try:
+        lTops = makeArea(lRoot, args.projects, args.components, args.shared, args.lines)
+
+        lIsolated, lIsolatedCommands = timeBatch(lRoot, lTops, False)
+        lShared, lSharedCommands = timeBatch(lRoot, lTops, True)
+        assert lIsolatedCommands == lSharedCommands
+
+        print('projects: {}, components per project: {} ({:.0%} shared)'.format(args.projects, args.components, args.shared))
+        print('{:<20} {:>9.3f}s'.format('isolated parsers', lIsolated))
+        print('{:<20} {:>9.3f}s {:>7.1f}x'.format('shared ParseMemo', lShared, lIsolated / lShared))
+    finally:
+        shutil.rmtree(lRoot)
+
+
+if __name__ == '__main__':
+    main()
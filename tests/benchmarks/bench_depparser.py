@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""Dep file parser benchmark
+
+Builds a synthetic work area with a top-level dep file including a number
+of component dep files, then times line parsing and DepFileParser.parse
+with and without the DepLineTokenizer fast path and the FileSystemIndex.
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from os.path import join
+
+from ipbb.depparser.Pathmaker import Pathmaker
+from ipbb.depparser.DepFileParser import DepFileParser
+from ipbb.depparser.FileSystemIndex import FileSystemIndex
+
+
+# ------------------------------------------------------------------------------
+def makeArea(aRoot, aLines, aComponents, aSources, aReuse=1):
+    lLinesPerCmp = aLines // aComponents
+    lTop = []
+    for c in range(aComponents):
+        lCmp = 'cmp{}'.format(c)
+        lHdl = join(aRoot, 'pkg', lCmp, 'firmware', 'hdl')
+        lCfg = join(aRoot, 'pkg', lCmp, 'firmware', 'cfg')
+        os.makedirs(lHdl)
+        os.makedirs(lCfg)
+        for s in range(aSources):
+            open(join(lHdl, 'src{}.vhd'.format(s)), 'w').close()
+
+        with open(join(lCfg, lCmp + '.dep'), 'w') as f:
+            for l in range(lLinesPerCmp):
+                lSrc = 'src{}.vhd'.format(l % aSources)
+                f.write(('src {}\n', 'src -l lib{} {{}}\n'.format(c), 'src --vhdl2008 -c pkg:{} {{}}\n'.format(lCmp))[l % 3].format(lSrc))
+        lTop += ['include -c {}'.format(lCmp)] * aReuse
+
+    os.makedirs(join(aRoot, 'pkg', 'top', 'firmware', 'cfg'))
+    with open(join(aRoot, 'pkg', 'top', 'firmware', 'cfg', 'top.dep'), 'w') as f:
+        f.write('\n'.join(lTop) + '\n')
+
+
+# ------------------------------------------------------------------------------
+def timeParse(aRoot, aFast, aRepeat, aIndex=False):
+    lBest = None
+    for _ in range(aRepeat):
+        lParser = DepFileParser('vivado', Pathmaker(aRoot, fsindex=FileSystemIndex(aRoot) if aIndex else None))
+        if not aFast:
+            lParser.parseLineFast = lambda aTokens: None
+        lStart = time.time()
+        lParser.parse('pkg', 'top', 'top.dep')
+        lElapsed = time.time() - lStart
+        lBest = lElapsed if lBest is None else min(lBest, lElapsed)
+    return lBest, lParser
+
+
+# ------------------------------------------------------------------------------
+def timeLines(aRoot, aParse):
+    lLines = []
+    for lDir, _, lFiles in os.walk(aRoot):
+        for lFile in lFiles:
+            if lFile.endswith('.dep'):
+                with open(join(lDir, lFile)) as f:
+                    lLines += [l.split() for l in f]
+
+    lStart = time.time()
+    for lTokens in lLines:
+        aParse(lTokens)
+    return time.time() - lStart
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--lines', type=int, default=50000)
+    parser.add_argument('-c', '--components', type=int, default=100)
+    parser.add_argument('-s', '--sources', type=int, default=50)
+    parser.add_argument('-u', '--reuse', type=int, default=1, help='Number of times each component is included')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lRoot = tempfile.mkdtemp()
+    try:
+        makeArea(lRoot, args.lines, args.components, args.sources, args.reuse)
+
+        lParser = DepFileParser('vivado', Pathmaker(lRoot))
+        lSlowLines = timeLines(lRoot, lParser.parseLine)
+        lFastLines = timeLines(lRoot, lParser.parseLineFast)
+
+        lSlow, lSlowParser = timeParse(lRoot, False, args.repeat)
+        lFast, lFastParser = timeParse(lRoot, True, args.repeat)
+        lIndexed, lIndexedParser = timeParse(lRoot, True, args.repeat, True)
+        assert lSlowParser.commands == lFastParser.commands == lIndexedParser.commands
+
+        print('dep lines: {}, includes per component: {}'.format(args.lines, args.reuse))
+        print('{:<20} {:>10} {:>10} {:>8}'.format('', 'argparse', 'tokenizer', 'speedup'))
+        print('{:<20} {:>9.3f}s {:>9.3f}s {:>7.1f}x'.format('line parsing', lSlowLines, lFastLines, lSlowLines / lFastLines))
+        print('{:<20} {:>9.3f}s {:>9.3f}s {:>7.1f}x'.format('DepFileParser.parse', lSlow, lFast, lSlow / lFast))
+        print('{:<20} {:>10} {:>9.3f}s {:>7.1f}x'.format('  + fsindex', '', lIndexed, lSlow / lIndexed))
+    finally:
+        shutil.rmtree(lRoot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""File hashing throughput benchmark
+
+Hashes a large file (e.g. a netlist or a packaged IP) with:
+
+- the original loop: f.read chunks, each fed to the file, group and project hashes;
+- the same loop, feeding the file hash only;
+- readinto a reused buffer (ipbb.tools.hashing.updateFromFile, below the mmap threshold);
+- a memory map (ipbb.tools.hashing.updateFromFile, above the mmap threshold).
+
+The file is read once before timing, throughputs are for a warm page cache.
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from ipbb.tools.hashing import kChunkSize, updateFromFile
+
+
+# ------------------------------------------------------------------------------
+def readLoop(aPath, aAlgo, aChunkSize, aUpdateHashes):
+    lHash = aAlgo()
+    with open(aPath, 'rb') as f:
+        for lChunk in iter(lambda: f.read(aChunkSize), b''):
+            lHash.update(lChunk)
+            for lUpHash in aUpdateHashes:
+                lUpHash.update(lChunk)
+    return lHash.digest()
+
+
+# ------------------------------------------------------------------------------
+def zeroCopy(aPath, aAlgo, aChunkSize, aMmapThreshold):
+    lHash = aAlgo()
+    with open(aPath, 'rb') as f:
+        updateFromFile(lHash, f, os.fstat(f.fileno()).st_size, aChunkSize, aMmapThreshold)
+    return lHash.digest()
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--size', type=int, default=256, help='File size, in MiB')
+    parser.add_argument('-a', '--algo', default='sha1')
+    parser.add_argument('-c', '--chunk-size', type=int, default=kChunkSize)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lAlgo = getattr(hashlib, args.algo)
+    lFd, lPath = tempfile.mkstemp(suffix='.edf')
+    try:
+        with os.fdopen(lFd, 'wb') as f:
+            lBlock = os.urandom(1 << 20)
+            for _ in range(args.size):
+                f.write(lBlock)
+
+        lMethods = [
+            ('read, 3 hashes', lambda: readLoop(lPath, lAlgo, args.chunk_size, [lAlgo(), lAlgo()])),
+            ('read', lambda: readLoop(lPath, lAlgo, args.chunk_size, [])),
+            ('readinto', lambda: zeroCopy(lPath, lAlgo, args.chunk_size, None)),
+            ('mmap', lambda: zeroCopy(lPath, lAlgo, args.chunk_size, 1)),
+        ]
+
+        lDigests = set()
+        print('{} MiB file, {}, {} bytes chunks'.format(args.size, args.algo, args.chunk_size))
+        print('{:<16}{:>10}{:>10}'.format('', 'time (s)', 'MB/s'))
+        for lName, lMethod in lMethods:
+            lDigests.add(lMethod())
+            lBest = None
+            for _ in range(args.repeat):
+                lStart = time.time()
+                lMethod()
+                lElapsed = time.time() - lStart
+                lBest = lElapsed if lBest is None else min(lBest, lElapsed)
+            print('{:<16}{:>10.3f}{:>10.0f}'.format(lName, lBest, args.size * (1 << 20) / lBest / 1e6))
+        assert len(lDigests) == 1
+    finally:
+        os.remove(lPath)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Dep file parser memory benchmark
+
+Measures, with tracemalloc, the memory held by the state of a
+DepFileParser after parsing a synthetic work area, and the footprint of
+individual Command objects compared to a plain (__dict__-based) object.
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import shutil
+import tempfile
+import tracemalloc
+
+from ipbb.depparser.Pathmaker import Pathmaker
+from ipbb.depparser.DepFileParser import DepFileParser, Command
+
+from bench_depparser import makeArea
+
+
+# ------------------------------------------------------------------------------
+class DictCommand(object):
+    """Command layout without __slots__ nor interning, for reference"""
+    def __init__(self, aFilePath, aPackage, aComponent, aLib, aInclude, aTopLevel, aVhdl2008, aFinalise):
+        self.FilePath = aFilePath
+        self.Package = aPackage
+        self.Component = aComponent
+        self.Lib = aLib
+        self.Include = aInclude
+        self.TopLevel = aTopLevel
+        self.Vhdl2008 = aVhdl2008
+        self.Finalise = aFinalise
+
+
+# ------------------------------------------------------------------------------
+def measure(aFunc):
+    tracemalloc.start()
+    try:
+        lResult = aFunc()
+        lCurrent, lPeak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return lResult, lCurrent, lPeak
+
+
+# ------------------------------------------------------------------------------
+def makeCommands(aClass, n):
+    # Names built at runtime, as the parser does from dep file lines
+    return [
+        aClass('/src/pkg/cmp{}/firmware/hdl/file{}.vhd'.format(i % 100, i), ''.join(['p', 'kg']), 'cmp{}'.format(i % 100), 'lib{}'.format(i % 10), True, False, False, False)
+        for i in range(n)
+    ]
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--lines', type=int, default=50000)
+    parser.add_argument('-c', '--components', type=int, default=100)
+    parser.add_argument('-s', '--sources', type=int, default=500)
+    args = parser.parse_args()
+
+    lRoot = tempfile.mkdtemp()
+    try:
+        makeArea(lRoot, args.lines, args.components, args.sources)
+
+        def parse():
+            lParser = DepFileParser('vivado', Pathmaker(lRoot))
+            lParser.parse('pkg', 'top', 'top.dep')
+            return lParser
+
+        lParser, lCurrent, lPeak = measure(parse)
+        lCommands = sum(len(v) for v in lParser.commands.values())
+        print('dep lines: {}, commands: {}'.format(args.lines, lCommands))
+        print('parser state: {:.1f} MB (peak {:.1f} MB)'.format(lCurrent / 1e6, lPeak / 1e6))
+    finally:
+        shutil.rmtree(lRoot)
+
+    print('{:<20} {:>12}'.format('', 'bytes/command'))
+    for lClass in (DictCommand, Command):
+        _, lCurrent, _ = measure(lambda: makeCommands(lClass, args.lines))
+        print('{:<20} {:>12.0f}'.format(lClass.__name__, float(lCurrent) / args.lines))
+
+
+if __name__ == '__main__':
+    main()
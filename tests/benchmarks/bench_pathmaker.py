@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Pathmaker path building benchmark
+
+Times a workload of getPath calls, as issued by the dep parser (a few
+distinct components, commands and file names, each queried many times),
+with the memoized path builder and with the uncached one.
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import time
+
+from ipbb.depparser.Pathmaker import Pathmaker
+
+
+# ------------------------------------------------------------------------------
+def workload(aCalls, aDistinct):
+    lCommands = ['src', 'include', 'addrtab', 'setup']
+    lArgs = [
+        ('pkg{}'.format(i % 7), 'cmp{}'.format(i % 101), lCommands[i % len(lCommands)], 'file{}.vhd'.format(i % aDistinct), None)
+        for i in range(aDistinct)
+    ]
+    return [lArgs[i % aDistinct] for i in range(aCalls)]
+
+
+# ------------------------------------------------------------------------------
+def timeCalls(aGetPath, aArgs, aRepeat):
+    lBest = None
+    for _ in range(aRepeat):
+        lStart = time.time()
+        for lArgs in aArgs:
+            aGetPath(*lArgs)
+        lElapsed = time.time() - lStart
+        lBest = lElapsed if lBest is None else min(lBest, lElapsed)
+    return lBest
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--calls', type=int, default=100000)
+    parser.add_argument('-d', '--distinct', type=int, default=5000, help='Number of distinct argument tuples')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    lArgs = workload(args.calls, args.distinct)
+
+    lPathmaker = Pathmaker('/firmware/src')
+    lUncached = Pathmaker('/firmware/src')
+    # Bypass the memoization
+    lUncached._buildPath = lambda *aArgs: Pathmaker._buildPath(lUncached, *aArgs)
+
+    lCached = timeCalls(lPathmaker.getPath, lArgs, args.repeat)
+    lPlain = timeCalls(lUncached.getPath, lArgs, args.repeat)
+
+    print('{} getPath calls, {} distinct paths'.format(args.calls, args.distinct))
+    print('{:<12}{:>12}{:>16}'.format('', 'time (ms)', 'calls/s'))
+    for lName, lTime in [('uncached', lPlain), ('memoized', lCached)]:
+        print('{:<12}{:>12.1f}{:>16.0f}'.format(lName, lTime * 1e3, args.calls / lTime))
+    print('speed-up: {:.1f}x'.format(lPlain / lCached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""Dependency parsing benchmark suite
+
+Generates synthetic work areas of increasing size with tests/repogen and
+measures, for each of them:
+
+- DepFileParser.parse: time, dep file lines and files per second, peak memory;
+- Pathmaker: path building and glob expansion throughput;
+- VivadoProjectMaker and ModelSimProjectMaker: script generation time.
+
+Results can be saved as JSON (--save) and compared against a previous run
+(--baseline): the exit status is non-zero if any timing got slower than the
+tolerance allows.
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from collections import OrderedDict
+from os.path import join, dirname, abspath
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'repogen'))
+
+from repogen import RepoSpec, generate
+
+from ipbb.depparser.Pathmaker import Pathmaker
+from ipbb.depparser.DepFileParser import DepFileParser
+from ipbb.depparser.VivadoProjectMaker import VivadoProjectMaker
+from ipbb.depparser.ModelSimProjectMaker import ModelSimProjectMaker
+
+
+# Results compared to the baseline
+kTimings = ('parse', 'getPath', 'glob', 'make vivado', 'make modelsim')
+
+
+# ------------------------------------------------------------------------------
+class ProjInfo(object):
+    def __init__(self, aPath, aName):
+        self.path = aPath
+        self.name = aName
+
+
+# ------------------------------------------------------------------------------
+def best(aFunc, aRepeat):
+    '''Best time out of aRepeat runs, and the result of the last one'''
+    lBest = None
+    for _ in range(aRepeat):
+        lStart = time.time()
+        lResult = aFunc()
+        lElapsed = time.time() - lStart
+        lBest = lElapsed if lBest is None else min(lBest, lElapsed)
+    return lBest, lResult
+
+
+# ------------------------------------------------------------------------------
+def benchParser(aSrcDir, aTop, aRepeat):
+    def parse():
+        lParser = DepFileParser('vivado', Pathmaker(aSrcDir))
+        lParser.parse(*aTop)
+        return lParser
+
+    lTime, lParser = best(parse, aRepeat)
+
+    tracemalloc.start()
+    parse()
+    _, lPeak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lLines = 0
+    for lPath in lParser._stamps:
+        if lPath.endswith('.dep'):
+            with open(lPath) as f:
+                lLines += sum(1 for _ in f)
+
+    lCommands = sum(len(c) for c in lParser.commands.values())
+    lResults = OrderedDict([
+        ('parse', lTime),
+        ('lines/s', lLines / lTime),
+        ('commands/s', lCommands / lTime),
+        ('peak MB', lPeak / 1e6),
+    ])
+    return lResults, lParser
+
+
+# ------------------------------------------------------------------------------
+def benchPathmaker(aSrcDir, aParser, aRepeat):
+    lPathmaker = Pathmaker(aSrcDir)
+    lExprs = [
+        (c.Package, c.Component, 'src', os.path.basename(c.FilePath))
+        for c in aParser.commands['src']
+    ]
+
+    def getPaths():
+        for lPkg, lCmp, lCmd, lName in lExprs:
+            lPathmaker.getPath(lPkg, lCmp, lCmd, lName)
+
+    def globs():
+        for lPkg, lCmp, lCmd, lName in lExprs:
+            lPathmaker.glob(lPkg, lCmp, lCmd, lName)
+
+    lGetPath, _ = best(getPaths, aRepeat)
+    lGlob, _ = best(globs, aRepeat)
+    return OrderedDict([
+        ('getPath', lGetPath),
+        ('getPath/s', len(lExprs) / lGetPath),
+        ('glob', lGlob),
+        ('glob/s', len(lExprs) / lGlob),
+    ])
+
+
+# ------------------------------------------------------------------------------
+def benchMakers(aProjDir, aParser, aRepeat):
+    lProjInfo = ProjInfo(aProjDir, 'bench')
+    lResults = OrderedDict()
+    for lName, lMaker in [
+        ('vivado', VivadoProjectMaker(lProjInfo)),
+        ('modelsim', ModelSimProjectMaker(lProjInfo, 'ipcores_proj')),
+    ]:
+        def write():
+            lLines = []
+            lMaker.write(lambda *args: lLines.append(' '.join(args)), aParser.vars, aParser.components, aParser.commands, aParser.libs)
+        lResults[lName], _ = best(write, aRepeat)
+    return lResults
+
+
+# ------------------------------------------------------------------------------
+def runSize(aFiles, aRepeat):
+    lRoot = tempfile.mkdtemp()
+    try:
+        lSpec = RepoSpec.forFiles(aFiles)
+        lTop = generate(lRoot, lSpec)
+        lSrcDir = join(lRoot, 'src')
+
+        lParse, lParser = benchParser(lSrcDir, lTop, aRepeat)
+        lResults = OrderedDict([('files', lSpec.files)])
+        lResults.update(lParse)
+        lResults['files/s'] = lSpec.files / lParse['parse']
+        lResults.update(benchPathmaker(lSrcDir, lParser, aRepeat))
+        lResults.update(('make ' + k, v) for k, v in benchMakers(lRoot, lParser, aRepeat).items())
+        return lResults
+    finally:
+        shutil.rmtree(lRoot)
+
+
+# ------------------------------------------------------------------------------
+def compare(aResults, aBaseline, aTolerance):
+    '''Returns the timings slower than in the baseline by more than aTolerance'''
+    lRegressions = []
+    for lSize, lResults in aResults.items():
+        for lKey, lValue in lResults.items():
+            lBase = aBaseline.get(lSize, {}).get(lKey)
+            if lBase is None or lKey not in kTimings:
+                continue
+            if lValue > lBase * (1 + aTolerance):
+                lRegressions.append((lSize, lKey, lBase, lValue))
+    return lRegressions
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Work area sizes, in files')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--save', default=None, help='Save the results to a JSON file')
+    parser.add_argument('--baseline', default=None, help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Relative slowdown tolerated with respect to the baseline')
+    args = parser.parse_args()
+
+    lResults = OrderedDict()
+    for lSize in args.sizes:
+        lResults[str(lSize)] = runSize(lSize, args.repeat)
+
+    lKeys = list(next(iter(lResults.values())))
+    print('{:<16}'.format('') + ''.join('{:>14}'.format(s) for s in lResults))
+    for lKey in lKeys:
+        print('{:<16}'.format(lKey) + ''.join('{:>14.4g}'.format(r[lKey]) for r in lResults.values()))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(lResults, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            lRegressions = compare(lResults, json.load(f), args.tolerance)
+        for lSize, lKey, lBase, lValue in lRegressions:
+            print('REGRESSION {} files, {}: {:.4g}s -> {:.4g}s'.format(lSize, lKey, lBase, lValue))
+        if lRegressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+from __future__ import print_function, absolute_import
+
+import pytest
+import os
+import time
+
+from os.path import join, dirname
+
+
+# ------------------------------------------------------------------------------
+def writeTree(aRoot, aFiles):
+    """Writes a tree of files
+
+    Args:
+        aRoot (str): Destination folder
+        aFiles (dict): path-to-content map, paths relative to aRoot
+    """
+    for lPath, lContent in aFiles.items():
+        lPath = join(aRoot, lPath)
+        if not os.path.exists(dirname(lPath)):
+            os.makedirs(dirname(lPath))
+        with open(lPath, 'w') as f:
+            f.write(lContent)
+
+
+# ------------------------------------------------------------------------------
+def backdate(aRoot, aSeconds=60):
+    """Moves the modification times of a tree out of the dependency cache racy window"""
+    lTime = time.time() - aSeconds
+    for lDir, _, lFiles in os.walk(aRoot):
+        for lPath in [lDir] + [join(lDir, f) for f in lFiles]:
+            os.utime(lPath, (lTime, lTime))
+
+
+# ------------------------------------------------------------------------------
+kSimpleArea = {
+    'pkg/top/firmware/cfg/top.dep': (
+        '@device_name = "xc7k325t"\n'
+        '?toolset == "Vivado"? src top_vivado.vhd\n'
+        'src top.vhd\n'
+        'include -c common\n'
+        'include -c pkg:slaves slave_a.dep slave_b.dep\n'
+        'src -c other:absent absent.vhd\n'
+        'addrtab -t top.xml\n'
+    ),
+    'pkg/top/firmware/hdl/top.vhd': '-- top\n',
+    'pkg/top/firmware/hdl/top_vivado.vhd': '-- top vivado\n',
+    'pkg/top/addr_table/top.xml': '<node/>\n',
+    'pkg/common/firmware/cfg/common.dep': (
+        'src -l common_lib common_pkg.vhd common.vhd\n'
+        'setup -f common.tcl\n'
+    ),
+    'pkg/common/firmware/cfg/common.tcl': '# common\n',
+    'pkg/common/firmware/hdl/common.vhd': '-- common\n',
+    'pkg/common/firmware/hdl/common_pkg.vhd': '-- common pkg\n',
+    'pkg/slaves/firmware/cfg/slave_a.dep': 'include -c common\nsrc slave_a.vhd\n',
+    'pkg/slaves/firmware/cfg/slave_b.dep': 'include -c common\nsrc slave_b.vhd\n',
+    'pkg/slaves/firmware/hdl/slave_a.vhd': '-- slave a\n',
+    'pkg/slaves/firmware/hdl/slave_b.vhd': '-- slave b\n',
+}
+
+
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def srcdir(tmp_path):
+    """Minimal firmware source tree, rooted in a temporary folder"""
+    lSrcDir = str(tmp_path / 'src')
+    writeTree(lSrcDir, kSimpleArea)
+    return lSrcDir
+
+
+# ------------------------------------------------------------------------------
+kSimpleProjects = {
+    'top': {'toolset': 'vivado', 'topPkg': 'pkg', 'topCmp': 'top', 'topDep': 'top.dep'},
+    'slave': {'toolset': 'sim', 'topPkg': 'pkg', 'topCmp': 'slaves', 'topDep': 'slave_b.dep'},
+}
+
+
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def workarea(tmp_path, monkeypatch):
+    """Work area with the minimal source tree and a project area per entry of kSimpleProjects"""
+    import yaml
+    from ipbb.defaults import kWorkAreaFile, kProjAreaFile, kSourceDir, kProjDir
+
+    lWorkDir = str(tmp_path / 'work')
+    writeTree(lWorkDir, {kWorkAreaFile: ''})
+    writeTree(join(lWorkDir, kSourceDir), kSimpleArea)
+    backdate(join(lWorkDir, kSourceDir))
+    writeTree(join(lWorkDir, kProjDir), {
+        join(lName, kProjAreaFile): yaml.safe_dump(lSettings) for lName, lSettings in kSimpleProjects.items()
+    })
+
+    monkeypatch.chdir(lWorkDir)
+    return lWorkDir
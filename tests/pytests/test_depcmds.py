@@ -0,0 +1,277 @@
+from __future__ import print_function, absolute_import
+
+import pytest
+import os
+import re
+
+from os.path import join
+from click.testing import CliRunner
+
+from ipbb.cmds import Environment
+from ipbb.cli.dep import dep
+from ipbb.defaults import kProjDir, kProjDepCacheFile
+
+
+# ------------------------------------------------------------------------------
+def invoke(*aArgs):
+    lResult = CliRunner().invoke(dep, list(aArgs), obj=Environment(), catch_exceptions=False)
+    assert lResult.exit_code == 0, lResult.output
+    return lResult.output
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('aPath, aProjects', [
+    ('src/pkg/common/firmware/hdl/common.vhd', ['slave', 'top']),
+    ('src/pkg/top/firmware/hdl/top.vhd', ['top']),
+    ('src/pkg/slaves/firmware/cfg/slave_b.dep', ['slave', 'top']),
+    ('src/pkg/slaves/firmware/cfg/slave_a.dep', ['top']),
+    # New files next to literal paths only
+    ('src/pkg/slaves/firmware/hdl/slave_c.vhd', []),
+    ('src/pkg/top/addr_table/new.xml', []),
+    # Missing file
+    ('src/other/absent/firmware/hdl/absent.vhd', ['top']),
+    ('src/pkg/top/firmware/cfg/other.tcl', []),
+    ('src/other/file.vhd', []),
+])
+def test_impact(workarea, aPath, aProjects):
+    assert invoke('impact', '-l', aPath).split() == aProjects
+
+    # Answered from the project caches
+    for lProj in aProjects:
+        assert os.path.exists(join(workarea, kProjDir, lProj, kProjDepCacheFile))
+
+
+# ------------------------------------------------------------------------------
+def addBrokenProject(aWorkArea):
+    import yaml
+    from ipbb.defaults import kProjAreaFile
+    from .conftest import writeTree
+
+    writeTree(aWorkArea, {
+        join(kProjDir, 'broken', kProjAreaFile): yaml.safe_dump(
+            {'toolset': 'vivado', 'topPkg': 'pkg', 'topCmp': 'broken', 'topDep': 'broken.dep'}
+        ),
+        'src/pkg/broken/firmware/cfg/broken.dep': '?undefined_var? src broken.vhd\n',
+    })
+
+
+# ------------------------------------------------------------------------------
+def test_impact_glob(workarea):
+    from .conftest import writeTree
+
+    writeTree(workarea, {'src/pkg/slaves/firmware/cfg/slave_b.dep': 'include -c common\nsrc slave_*.vhd\n'})
+    assert invoke('impact', '-l', 'src/pkg/slaves/firmware/hdl/slave_c.vhd').split() == ['slave', 'top']
+
+
+# ------------------------------------------------------------------------------
+def test_impact_broken(workarea):
+    addBrokenProject(workarea)
+    lResult = CliRunner().invoke(dep, ['impact', '-l', 'src/pkg/common/firmware/hdl/common.vhd'], obj=Environment())
+    assert lResult.exit_code == 0
+    lLines = lResult.output.splitlines()
+    assert lLines[0].startswith('Failed to resolve the dependencies of project broken: Parsing directive failed')
+    assert lLines[1:] == ['slave', 'top']
+
+
+# ------------------------------------------------------------------------------
+def test_impact_table(workarea):
+    lOutput = invoke('impact', 'src/pkg/common/firmware/hdl/common.vhd', 'src/pkg/top/firmware/hdl/top.vhd')
+    lRows = [re.split(r'\s{2,}', l.strip('| ')) for l in lOutput.splitlines() if l.startswith('|')]
+    assert lRows[0] == ['project', 'path', 'dep file', 'package', 'component']
+    assert lRows[1:] == [
+        ['slave', 'pkg/common/firmware/hdl/common.vhd', 'pkg/common/firmware/cfg/common.dep', 'pkg', 'common'],
+        ['top', 'pkg/common/firmware/hdl/common.vhd', 'pkg/common/firmware/cfg/common.dep', 'pkg', 'common'],
+        ['top', 'pkg/top/firmware/hdl/top.vhd', 'pkg/top/firmware/cfg/top.dep', 'pkg', 'top'],
+    ]
+
+
+# ------------------------------------------------------------------------------
+def test_batch(workarea, monkeypatch):
+    import ipbb.depparser.DepFileParser as DepFileParserModule
+
+    def rows(aOutput):
+        # Timings excluded
+        return [re.split(r'\s{2,}', l.strip('| '))[:-1] for l in aOutput.splitlines() if l.startswith('|')][1:]
+
+    lRows = [['slave', '1', '3', '0', '0', '0'], ['top', '1', '6', '1', '0', '1']]
+    assert rows(invoke('batch')) == lRows
+
+    # Dep files shared by both projects are read once
+    lOpened = []
+
+    def countingOpen(aPath, *args, **kwargs):
+        lOpened.append(os.path.basename(aPath))
+        return open(aPath, *args, **kwargs)
+
+    monkeypatch.setattr(DepFileParserModule, 'open', countingOpen, raising=False)
+    assert rows(invoke('batch', '--force', 'top', 'slave')) == lRows[::-1]
+    assert sorted(lOpened) == ['common.dep', 'slave_a.dep', 'slave_b.dep', 'top.dep']
+
+    # Results are cached in each project area
+    del lOpened[:]
+    assert rows(invoke('batch')) == lRows
+    assert lOpened == []
+
+
+# ------------------------------------------------------------------------------
+def test_batch_broken(workarea):
+    addBrokenProject(workarea)
+    lResult = CliRunner().invoke(dep, ['batch'], obj=Environment())
+    assert lResult.exit_code == 1
+
+    lRows = [re.split(r'\s{2,}', l.strip('| '))[:-1] for l in lResult.output.splitlines() if l.startswith('|')][1:]
+    assert lRows == [['broken'] + ['error'] * 5, ['slave', '1', '3', '0', '0', '0'], ['top', '1', '6', '1', '0', '1']]
+    assert 'Failed to resolve the dependencies of 1 project(s): broken' in lResult.output
+
+
+# ------------------------------------------------------------------------------
+def test_profile(workarea):
+    import json
+
+    lJson = join(workarea, 'profile.json')
+    lOutput = invoke('-p', 'top', 'profile', '-n', '2', '-j', lJson)
+    assert lOutput.startswith('Parsed 4 dep files')
+    assert len([l for l in lOutput.splitlines() if l.startswith('| pkg/')]) == 2
+
+    with open(lJson) as f:
+        lProfiles = {os.path.basename(p['path']): p for p in json.load(f)['depfiles']}
+    assert [lProfiles[d]['depth'] for d in ('top.dep', 'slave_a.dep', 'common.dep')] == [1, 2, 2]
+    assert (lProfiles['common.dep']['parsed'], lProfiles['common.dep']['reused']) == (1, 2)
+    assert (lProfiles['top.dep']['lines'], lProfiles['top.dep']['globs'], lProfiles['top.dep']['evals']) == (7, 7, 2)
+    assert lProfiles['top.dep']['total'] >= lProfiles['top.dep']['time'] + lProfiles['slave_a.dep']['total']
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('aFormat', ['json', 'jsonl', 'msgpack'])
+def test_export(workarea, tmp_path, aFormat):
+    import json
+    from ipbb.depparser.DepGraphExporter import DepGraphExporter
+
+    if aFormat == 'json':
+        lGraph = json.loads(invoke('-p', 'top', 'export', '-f', aFormat))
+    else:
+        if aFormat == 'jsonl':
+            lRecords = [json.loads(lLine) for lLine in invoke('-p', 'top', 'export', '-f', aFormat).splitlines()]
+        else:
+            msgpack = pytest.importorskip('msgpack')
+            lPath = str(tmp_path / 'graph.msgpack')
+            invoke('-p', 'top', 'export', '-f', aFormat, '-o', lPath)
+            with open(lPath, 'rb') as f:
+                lRecords = list(msgpack.Unpacker(f, raw=False))
+
+        lGraph = {}
+        for lRecord in lRecords:
+            lGraph.setdefault(DepGraphExporter.kSections[lRecord.pop('type')], []).append(lRecord)
+        lGraph['header'] = lGraph['header'][0]
+
+        # Same graph as the json export
+        assert lGraph == json.loads(invoke('-p', 'top', 'export', '-f', 'json'))
+
+    assert lGraph['header']['top'].endswith('pkg/top/firmware/cfg/top.dep')
+    assert {v['name']: v['value'] for v in lGraph['vars']}['device_name'] == 'xc7k325t'
+    assert lGraph['libs'] == [{'name': 'common_lib'}]
+    assert [(c['group'], os.path.basename(c['path']), c['lib'], c['flags']) for c in lGraph['commands'] if c['group'] != 'src'] == [
+        ('setup', 'common.tcl', None, ['finalise']),
+        ('addrtab', 'top.xml', None, ['top']),
+    ]
+    assert [m['package'] for m in lGraph['missing']] == ['other']
+
+    # common.dep is included 3 times, but exported once
+    lDepFiles = {d['id']: d for d in lGraph['depfiles']}
+    assert sorted(os.path.basename(d['path']) for d in lDepFiles.values()) == ['common.dep', 'slave_a.dep', 'slave_b.dep', 'top.dep']
+    assert [os.path.basename(lDepFiles[i]['path']) for i in lDepFiles[0]['includes']] == ['common.dep', 'slave_a.dep', 'slave_b.dep']
+
+    lDependants = {os.path.basename(d['path']): d['depfiles'] for d in lGraph['dependants']}
+    assert [os.path.basename(p) for p in lDependants['common.vhd']] == ['common.dep']
+
+
+# ------------------------------------------------------------------------------
+def test_hash(workarea, monkeypatch):
+    import hashlib
+    import collections
+    from binascii import hexlify
+    import ipbb.tools.hashing as hashing
+
+    os.chdir(join(workarea, kProjDir, 'top'))
+    lPaths = [c.FilePath for lCmds in Environment().depParser.commands.values() for c in lCmds]
+    for lPath in lPaths:
+        # Old enough for their digest to be cached
+        os.utime(lPath, (1e9, 1e9))
+
+    # Merkle tree: group -> package -> component -> file, with folder and file entries tagged
+    def digest(aChildren, aTag=hashing.kFolderTag):
+        lHash = hashlib.sha1(hashing.kFolderTag)
+        for lName, lDigest in aChildren:
+            lHash.update(aTag + lName.encode() + b'\0' + lDigest)
+        return lHash.digest()
+
+    lTree = collections.OrderedDict()
+    for lGrp, lCmds in Environment().depParser.commands.items():
+        lTree[lGrp] = collections.OrderedDict()
+        for c in lCmds:
+            with open(c.FilePath, 'rb') as f:
+                lTree[lGrp].setdefault(c.Package, collections.OrderedDict()).setdefault(c.Component, []).append(
+                    (os.path.relpath(c.FilePath, join(workarea, 'src')), hashlib.sha1(f.read()).digest())
+                )
+    lExpected = hexlify(digest(
+        (lGrp, digest((lPkg, digest((lCmp, digest(lFiles, hashing.kLeafTag)) for lCmp, lFiles in lCmps.items())) for lPkg, lCmps in lPkgs.items()))
+        for lGrp, lPkgs in lTree.items()
+    )).decode()
+
+    lManifest = join(workarea, 'manifest.json')
+    assert invoke('-p', 'top', 'hash', '-j', '1', '-m', lManifest).split() == [lExpected]
+    assert os.path.exists(join(workarea, 'var', 'hashcache'))
+
+    # Same digests whatever the number of threads, the read size and the cache
+    lOpened = []
+
+    def countingOpen(aPath, *args, **kwargs):
+        if aPath in lPaths:
+            lOpened.append(aPath)
+        return open(aPath, *args, **kwargs)
+
+    monkeypatch.setattr(hashing, 'open', countingOpen, raising=False)
+    lCached = invoke('-p', 'top', 'hash', '-v', '-j', '4', '-c', '3')
+    assert lOpened == []
+    assert '{} top'.format(lExpected) in lCached
+    assert invoke('-p', 'top', 'hash', '-v', '-j', '1', '--verify') == lCached
+    assert sorted(lOpened) == sorted(lPaths)
+
+    # Content changed behind the cache's back: same inode, size and mtime
+    with open(lPaths[0], 'r+') as f:
+        lContent = f.read()
+        f.seek(0)
+        f.write(lContent.upper())
+    os.utime(lPaths[0], (1e9, 1e9))
+    assert '{} top'.format(lExpected) in invoke('-p', 'top', 'hash', '-v')
+
+    lOutput = invoke('-p', 'top', 'hash', '--verify')
+    assert 'did not match' in lOutput
+    lDigest = lOutput.split()[-1]
+    assert lDigest != lExpected
+    assert invoke('-p', 'top', 'hash', '--compare', lManifest).splitlines() == [
+        lDigest, 'changed setup pkg common pkg/common/firmware/cfg/common.tcl'
+    ]
+
+
+# ------------------------------------------------------------------------------
+def test_hash_algorithms(workarea):
+    import json
+    from ipbb.tools.hashing import kAlgorithms
+
+    lManifest = join(workarea, 'manifest.json')
+    lDigest = invoke('-p', 'top', 'hash', '-a', 'blake2b', '-m', lManifest).strip()
+    assert len(lDigest) == 128
+    with open(lManifest) as f:
+        assert json.load(f)['algorithm'] == 'blake2b'
+    assert invoke('-p', 'top', 'hash', '-a', 'blake2b', '--compare', lManifest).splitlines() == [lDigest]
+
+    # Manifests computed with another algorithm cannot be compared against
+    lResult = CliRunner().invoke(dep, ['-p', 'top', 'hash', '--compare', lManifest], obj=Environment())
+    assert lResult.exit_code != 0
+    assert "--algo blake2b" in lResult.output
+
+    lOutput = invoke('-p', 'top', 'hash', '--benchmark', '-j', '2')
+    assert lOutput.startswith('8 files')
+    lRows = [re.split(r'\s{2,}', l.strip('| ')) for l in lOutput.splitlines() if l.startswith('|')]
+    assert sorted(r[0] for r in lRows[1:]) == sorted(kAlgorithms)
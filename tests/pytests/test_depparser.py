@@ -0,0 +1,444 @@
+from __future__ import print_function, absolute_import
+
+import pytest
+import os
+
+from os.path import join
+
+from ipbb.depparser.Pathmaker import Pathmaker
+from ipbb.depparser.DepFileParser import DepFileParser, DepFileCycleError, DirectiveCache, Command, uniquify
+from ipbb.depparser.DepFileCache import DepFileCache
+
+
+# ------------------------------------------------------------------------------
+def parseTop(aSrcDir, aVariables={}):
+    lParser = DepFileParser('vivado', Pathmaker(aSrcDir), aVariables)
+    lParser.parse('pkg', 'top', 'top.dep')
+    return lParser
+
+
+# ------------------------------------------------------------------------------
+def summary(aParser):
+    return (
+        {k: [(c.FilePath, c.Lib, tuple(c.flags())) for c in v] for k, v in aParser.commands.items()},
+        dict(aParser.components),
+        sorted(aParser.libs),
+        sorted((k, v) for k, v in aParser.vars.items()),
+        aParser.missing,
+        aParser._revDepMap,
+    )
+
+
+# ------------------------------------------------------------------------------
+def test_parse(srcdir):
+    lParser = parseTop(srcdir)
+
+    assert [os.path.basename(c.FilePath) for c in lParser.commands['src']] == [
+        'top_vivado.vhd', 'top.vhd', 'slave_a.vhd', 'common_pkg.vhd', 'common.vhd', 'slave_b.vhd'
+    ]
+    assert lParser.vars['device_name'] == 'xc7k325t'
+    assert list(lParser.components['pkg']) == ['top', 'common', 'slaves']
+    assert lParser.missingPackages == {'other'}
+    assert len(lParser.missing) == 1
+
+
+# ------------------------------------------------------------------------------
+def test_libs(srcdir):
+    from .conftest import writeTree, kSimpleArea
+
+    lTopDep = 'pkg/top/firmware/cfg/top.dep'
+    writeTree(srcdir, {lTopDep: kSimpleArea[lTopDep] + 'src -l lost_lib absent.vhd\n'})
+
+    # Libraries are recorded once per line, even if no file was found, including replayed subtrees
+    lParser = parseTop(srcdir)
+    assert lParser.libs == ['common_lib'] * 3 + ['lost_lib']
+
+    lIncremental = DepFileParser('vivado', Pathmaker(srcdir))
+    lIncremental.parse('pkg', 'top', 'top.dep', aPrevious=lParser._includes)
+    assert lIncremental.libs == lParser.libs
+
+
+# ------------------------------------------------------------------------------
+def test_spaced_conditional(srcdir):
+    from .conftest import writeTree, kSimpleArea
+
+    lTopDep = 'pkg/top/firmware/cfg/top.dep'
+    writeTree(srcdir, {lTopDep: kSimpleArea[lTopDep].replace('?toolset == "Vivado"?', '? toolset == "Vivado" ?')})
+    lParser = parseTop(srcdir)
+    assert os.path.basename(lParser.commands['src'][0].FilePath) == 'top_vivado.vhd'
+
+
+# ------------------------------------------------------------------------------
+def test_cache_roundtrip(srcdir, tmp_path):
+    from .conftest import backdate
+
+    lCachePath = str(tmp_path / 'depcache')
+    backdate(srcdir)
+
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lCache = DepFileCache(lCachePath, lParser, 'pkg', 'top', 'top.dep')
+    assert not lCache.restore()
+    lParser.parse('pkg', 'top', 'top.dep')
+    lCache.store()
+
+    lCached = DepFileParser('vivado', Pathmaker(srcdir))
+    assert DepFileCache(lCachePath, lCached, 'pkg', 'top', 'top.dep').restore()
+    assert summary(lCached) == summary(lParser)
+
+    # Different configurations do not share the cache
+    lOther = DepFileParser('sim', Pathmaker(srcdir))
+    assert not DepFileCache(lCachePath, lOther, 'pkg', 'top', 'top.dep').restore()
+    lOther = DepFileParser('vivado', Pathmaker(srcdir), ['x=1'])
+    assert not DepFileCache(lCachePath, lOther, 'pkg', 'top', 'top.dep').restore()
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('aChange', [
+    # Edited dep file
+    ('pkg/slaves/firmware/cfg/slave_b.dep', 'src slave_a.vhd slave_b.vhd\n'),
+    # New file in a globbed directory
+    ('pkg/slaves/firmware/hdl/slave_c.vhd', '-- slave c\n'),
+])
+def test_cache_invalidation(srcdir, tmp_path, aChange):
+    lCachePath = str(tmp_path / 'depcache')
+
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lCache = DepFileCache(lCachePath, lParser, 'pkg', 'top', 'top.dep')
+    lParser.parse('pkg', 'top', 'top.dep')
+    lCache.store()
+
+    lPath, lContent = aChange
+    with open(join(srcdir, lPath), 'w') as f:
+        f.write(lContent)
+    # Make sure the change is visible even on coarse-grained filesystem clocks
+    os.utime(os.path.dirname(join(srcdir, lPath)), (0, 0))
+    os.utime(join(srcdir, lPath), (0, 0))
+
+    lCached = DepFileParser('vivado', Pathmaker(srcdir))
+    assert not DepFileCache(lCachePath, lCached, 'pkg', 'top', 'top.dep').restore()
+
+
+# ------------------------------------------------------------------------------
+def test_cache_racy(srcdir, tmp_path):
+    lCachePath = str(tmp_path / 'depcache')
+    lLeaf = join(srcdir, 'pkg/slaves/firmware/cfg/slave_a.dep')
+
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lCache = DepFileCache(lCachePath, lParser, 'pkg', 'top', 'top.dep')
+    lParser.parse('pkg', 'top', 'top.dep')
+    lCache.store()
+
+    # Same size edit, within the same timestamp tick
+    lStat = os.stat(lLeaf)
+    with open(lLeaf, 'w') as f:
+        f.write('include -c common\nsrc slave_b.vhd\n')
+    os.utime(lLeaf, ns=(lStat.st_atime_ns, lStat.st_mtime_ns))
+
+    lCached = DepFileParser('vivado', Pathmaker(srcdir))
+    lCache = DepFileCache(lCachePath, lCached, 'pkg', 'top', 'top.dep')
+    assert not lCache.restore()
+    lCached.parse('pkg', 'top', 'top.dep', aPrevious=lCache.previous)
+    assert summary(lCached) == summary(parseTop(srcdir)) != summary(lParser)
+
+
+# ------------------------------------------------------------------------------
+def firstNodes(aParser):
+    lNodes = {}
+    for n in aParser._includes.nodes():
+        lNodes.setdefault((n.pkg, n.cmp, n.dep), n)
+    return lNodes
+
+
+# ------------------------------------------------------------------------------
+def test_incremental(srcdir):
+    lPrevious = parseTop(srcdir)
+    lPrevNodes = firstNodes(lPrevious)
+
+    lLeaf = join(srcdir, 'pkg/slaves/firmware/cfg/slave_a.dep')
+    with open(lLeaf, 'w') as f:
+        f.write('src slave_a.vhd\n')
+    os.utime(lLeaf, (0, 0))
+
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lParser.parse('pkg', 'top', 'top.dep', aPrevious=lPrevious._includes)
+
+    assert summary(lParser) == summary(parseTop(srcdir))
+
+    # Untouched subtrees are spliced in, the edited one and its parents are parsed again
+    lNodes = firstNodes(lParser)
+    assert lNodes['pkg', 'common', 'common.dep'] is lPrevNodes['pkg', 'common', 'common.dep']
+    assert lNodes['pkg', 'slaves', 'slave_b.dep'] is lPrevNodes['pkg', 'slaves', 'slave_b.dep']
+    assert lNodes['pkg', 'slaves', 'slave_a.dep'] is not lPrevNodes['pkg', 'slaves', 'slave_a.dep']
+    assert lNodes['pkg', 'top', 'top.dep'] is not lPrevNodes['pkg', 'top', 'top.dep']
+
+
+# ------------------------------------------------------------------------------
+def test_incremental_unchanged(srcdir):
+    lPrevious = parseTop(srcdir)
+
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lParser.parse('pkg', 'top', 'top.dep', aPrevious=lPrevious._includes)
+
+    assert lParser._includes is lPrevious._includes
+    assert summary(lParser) == summary(lPrevious)
+
+
+# ------------------------------------------------------------------------------
+kFastLines = [
+    'include', 'include a.dep', 'include -c x a.dep', 'include a.dep -c pkg:x', 'include --cd ../cfg -c x',
+    'setup -f', 'setup --finalise a.tcl -c pkg:cmp', 'src a.vhd b.vhd', 'src -l lib -n --vhdl2008 a.vhd',
+    'src a.vhd -l lib', 'src -c x -c y:z a.vhd', 'src -n a.vhd -n', 'addrtab -t', 'addrtab --toplevel -c pkg:x a.xml',
+    'iprepo ipcores', 'iprepo --cd .. -c x',
+]
+kSlowLines = [
+    'src', 'include a.dep -c x b.dep', 'include -c a:b:c', 'src --lib=x a', 'src --comp x a', 'src -l -x a',
+    'src a -- b', 'src - a', 'include -c', 'src -nl x a', 'unknown a.vhd', 'src -x a.vhd',
+]
+
+
+@pytest.mark.parametrize('aLine', kFastLines + kSlowLines)
+def test_tokenizer(aLine):
+    lParser = DepFileParser('vivado', Pathmaker('/'))
+    lTokens = aLine.split()
+
+    lFast = lParser.parseLineFast(lTokens)
+    assert (lFast is not None) == (aLine in kFastLines)
+    if lFast is None:
+        return
+    assert vars(lFast) == vars(lParser.parseLine(lTokens))
+
+
+# ------------------------------------------------------------------------------
+def makeCommands(n):
+    # Half of the commands are duplicates, with alternating libraries
+    return [
+        Command('/src/file{}.vhd'.format(i % (n // 2)), 'pkg', 'cmp', 'lib{}'.format(i % 2) if i % 3 else None, True, False, False, False)
+        for i in range(n)
+    ]
+
+
+def test_uniquify():
+    lCommands = [Command(p, 'pkg', 'cmp', l, True, False, False, False) for p, l in [
+        ('a', None), ('b', None), ('a', 'x'), ('c', None), ('a', None), ('b', None),
+    ]]
+    assert [(c.FilePath, c.Lib) for c in uniquify(lCommands)] == [('a', 'x'), ('c', None), ('a', None), ('b', None)]
+    # The last occurrence is kept
+    assert uniquify(lCommands)[-1] is lCommands[-1]
+
+
+def test_uniquify_scaling(monkeypatch):
+    lCalls = [0]
+    lEq = Command.__eq__
+
+    def countingEq(self, other):
+        lCalls[0] += 1
+        return lEq(self, other)
+
+    monkeypatch.setattr(Command, '__eq__', countingEq)
+
+    # Comparisons are limited to duplicates and hash collisions
+    n = 20000
+    uniquify(makeCommands(n))
+    assert lCalls[0] <= n
+
+
+# ------------------------------------------------------------------------------
+def test_memo(srcdir, monkeypatch):
+    import ipbb.depparser.DepFileParser as DepFileParserModule
+    lOpened = []
+
+    def countingOpen(aPath, *args, **kwargs):
+        lOpened.append(os.path.basename(aPath))
+        return open(aPath, *args, **kwargs)
+
+    monkeypatch.setattr(DepFileParserModule, 'open', countingOpen, raising=False)
+
+    lParser = parseTop(srcdir)
+    # common.dep is included 3 times, but read once
+    assert lOpened.count('common.dep') == 1
+    assert lParser.commands['setup'][0].Finalise
+    assert len(lParser._revDepMap[join(srcdir, 'pkg/common/firmware/hdl/common.vhd')]) == 3
+
+
+# ------------------------------------------------------------------------------
+def test_memo_variables(tmp_path):
+    from .conftest import writeTree
+
+    lSrcDir = str(tmp_path)
+    writeTree(lSrcDir, {
+        'pkg/top/firmware/cfg/top.dep': 'include -c a\n@x = 1\ninclude -c a\ninclude -c b\n@y = 2\ninclude -c b\n',
+        'pkg/a/firmware/cfg/a.dep': '?x == 1? src a_x.vhd\n?toolset == "Vivado"? src a.vhd\n',
+        'pkg/a/firmware/hdl/a.vhd': '',
+        'pkg/a/firmware/hdl/a_x.vhd': '',
+        'pkg/b/firmware/cfg/b.dep': '?"y" in vars()? src b_y.vhd\nsrc b.vhd\n',
+        'pkg/b/firmware/hdl/b.vhd': '',
+        'pkg/b/firmware/hdl/b_y.vhd': '',
+    })
+
+    # x is undefined on the first inclusion of a.dep
+    with pytest.raises(SystemExit):
+        parseTop(lSrcDir)
+
+    writeTree(lSrcDir, {'pkg/top/firmware/cfg/top.dep': '@x = 0\ninclude -c a\n@z = 1\ninclude -c a\ninclude -c b\n@y = 2\ninclude -c b\n'})
+    lParser = parseTop(lSrcDir)
+    lNodes = [n for n in lParser._includes.commands]
+    # Unrelated variables do not prevent reuse, introspection does
+    assert lNodes[0] is lNodes[1]
+    assert lNodes[2] is not lNodes[3]
+    assert [os.path.basename(c.FilePath) for c in lParser.commands['src']] == ['a.vhd', 'b_y.vhd', 'b.vhd']
+
+
+# ------------------------------------------------------------------------------
+def test_pathmaker_memo():
+    lPathmaker = Pathmaker('/src')
+    assert lPathmaker.getPath('pkg', 'cmp', 'src', 'a.vhd', cd='../x') == '/src/pkg/cmp/firmware/x/a.vhd'
+    assert lPathmaker.getPath('pkg', 'cmp', 'src', 'a.vhd', cd='../x') == '/src/pkg/cmp/firmware/x/a.vhd'
+    assert lPathmaker.getPackagePath('pkg/') == lPathmaker.getPath('pkg') == '/src/pkg'
+
+    if hasattr(lPathmaker._buildPath, 'cache_info'):
+        assert lPathmaker._buildPath.cache_info().hits == 1
+        # Caches are not shared between Pathmakers
+        assert Pathmaker('/other').getPath('pkg') == '/other/pkg'
+
+
+# ------------------------------------------------------------------------------
+def test_include_cycle(tmp_path):
+    from .conftest import writeTree
+
+    lSrcDir = str(tmp_path)
+    writeTree(lSrcDir, {
+        'pkg/top/firmware/cfg/top.dep': 'include -c a\n',
+        'pkg/a/firmware/cfg/a.dep': 'src a.vhd\ninclude -c b\n',
+        'pkg/a/firmware/hdl/a.vhd': '',
+        'pkg/b/firmware/cfg/b.dep': 'include -c a\n',
+    })
+
+    with pytest.raises(DepFileCycleError) as e:
+        parseTop(lSrcDir)
+    assert [os.path.relpath(p, lSrcDir) for p in e.value.chain] == [
+        'pkg/a/firmware/cfg/a.dep', 'pkg/b/firmware/cfg/b.dep', 'pkg/a/firmware/cfg/a.dep'
+    ]
+
+    # Include depth is not bound by the recursion limit
+    lDepth = 2000
+    writeTree(lSrcDir, dict(
+        [('pkg/top/firmware/cfg/top.dep', 'include -c c0\n')]
+        + [('pkg/c{}/firmware/cfg/c{}.dep'.format(i, i), 'include -c c{}\n'.format(i + 1)) for i in range(lDepth)]
+        + [('pkg/c{}/firmware/cfg/c{}.dep'.format(lDepth, lDepth), 'src c.vhd\n'), ('pkg/c{}/firmware/hdl/c.vhd'.format(lDepth), '')]
+    ))
+    lParser = parseTop(lSrcDir)
+    assert len(lParser.commands['src']) == 1
+    assert len(list(lParser._includes.nodes())) == lDepth + 2
+
+
+# ------------------------------------------------------------------------------
+def test_directive_cache():
+    lCache = DirectiveCache()
+    lCode, lNames = lCache.compile('toolset == "Vivado" and x > 1', 'eval')
+    assert lCache.compile('toolset == "Vivado" and x > 1', 'eval')[0] is lCode
+    assert lCache.compile(' toolset == "Vivado" and x > 1 ', 'eval')[0] is lCode
+    assert lNames == {'toolset', 'x'}
+
+    lVars = {'toolset': 'Vivado', 'x': 2, 'y': [1]}
+    assert lCache.evaluate(lCode, lNames, lVars)
+    lVars['y'].append(2)
+    assert lCache.evaluate(lCode, lNames, lVars)
+    assert len(lCache._results) == 1
+    lVars['x'] = 0
+    assert not lCache.evaluate(lCode, lNames, lVars)
+    assert len(lCache._results) == 2
+
+    # Assignments are replayed, unless the result is mutable
+    for lStmt, lExpected in [('z = x + 1', {'z': 1}), ('l = [x]', {'l': [0]})]:
+        lCode, lNames = lCache.compile(lStmt, 'exec')
+        for _ in range(2):
+            lResult = {'x': 0}
+            lCache.execute(lCode, lNames, lResult)
+            assert lResult == dict(lExpected, x=0)
+    assert len(lCache._results) == 3
+
+    # Introspection and unhashable values bypass the result cache
+    lCode, lNames = lCache.compile('"x" in vars() or y == [1]', 'eval')
+    assert lCache.evaluate(lCode, lNames, {'x': 0, 'y': []})
+    assert not lCache.evaluate(lCode, lNames, {'y': []})
+    lCode, lNames = lCache.compile('y == [1]', 'eval')
+    assert lCache.evaluate(lCode, lNames, {'y': [1]})
+    assert len(lCache._results) == 3
+
+    # Equal values of different types are cached separately
+    lCode, lNames = lCache.compile('str(x)', 'eval')
+    assert [lCache.evaluate(lCode, lNames, {'x': v}) for v in (1, 1.0, True)] == ['1', '1.0', 'True']
+
+
+# ------------------------------------------------------------------------------
+def test_impure_directive(tmp_path):
+    from .conftest import writeTree
+
+    lSrcDir = str(tmp_path / 'src')
+    lFlag = str(tmp_path / 'flag')
+    writeTree(lSrcDir, {
+        'pkg/top/firmware/cfg/top.dep': '?os.path.exists({!r})? src a.vhd\n?len(toolset) == 6? src b.vhd\n'.format(lFlag),
+        'pkg/top/firmware/hdl/a.vhd': '',
+        'pkg/top/firmware/hdl/b.vhd': '',
+    })
+
+    # Conditions on the outside world are evaluated on every parse
+    assert [os.path.basename(c.FilePath) for c in parseTop(lSrcDir).commands['src']] == ['b.vhd']
+    open(lFlag, 'w').close()
+    assert [os.path.basename(c.FilePath) for c in parseTop(lSrcDir).commands['src']] == ['a.vhd', 'b.vhd']
+
+    # Pure builtins of variables are still cached
+    lCache = DirectiveCache()
+    lCode, lNames = lCache.compile('len(toolset) == 6', 'eval')
+    assert lCache._resultKey(lCode, lNames, {'toolset': 'Vivado'}) is not None
+    lCode, lNames = lCache.compile('os.path.exists(toolset)', 'eval')
+    assert lCache._resultKey(lCode, lNames, {'toolset': 'Vivado'}) is None
+
+
+# ------------------------------------------------------------------------------
+def test_iterparse(srcdir):
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lPairs = list(lParser.iterparse('pkg', 'top', 'top.dep'))
+    assert summary(lParser) == summary(parseTop(srcdir))
+
+    # Repeated includes are replayed from the memo, their commands are yielded again
+    lSrcs = [os.path.basename(c.FilePath) for k, c in lPairs if k == 'src']
+    assert lSrcs.count('common.vhd') == 3
+    assert uniquify([c for k, c in lPairs if k == 'src']) == lParser.commands['src']
+
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lUnique = list(lParser.iterparse('pkg', 'top', 'top.dep', aUnique=True))
+    assert lUnique == [p for i, p in enumerate(lPairs) if p not in lPairs[:i]]
+    assert [os.path.basename(c.FilePath) for k, c in lUnique if k == 'src'] == [
+        'top_vivado.vhd', 'top.vhd', 'common_pkg.vhd', 'common.vhd', 'slave_a.vhd', 'slave_b.vhd'
+    ]
+
+
+# ------------------------------------------------------------------------------
+def test_missing_index(srcdir):
+    from .conftest import writeTree, kSimpleArea
+
+    lTopDep = 'pkg/top/firmware/cfg/top.dep'
+    writeTree(srcdir, {lTopDep: kSimpleArea[lTopDep] + 'src -c pkg:slaves absent.vhd\n'})
+    lParser = parseTop(srcdir)
+    lTopDep = join(srcdir, lTopDep)
+
+    lIndex = lParser.missingIndex
+    assert lParser.missingIndex is lIndex
+    assert len(lIndex) == 2
+    assert lParser.missingPackages == {'other'}
+    assert lParser.missingComponents == {'other': {'absent'}}
+    assert list(lParser.missingFiles) == ['other', 'pkg']
+    assert lParser.missingPaths == {join(srcdir, 'other/absent/firmware/hdl/absent.vhd'), join(srcdir, 'pkg/slaves/firmware/hdl/absent.vhd')}
+
+    assert [r.component for r in lIndex.lookup(aDepFile=lTopDep)] == ['absent', 'slaves']
+    assert [r.path for r in lIndex.lookup('pkg', 'slaves', aCmd='src')] == [join(srcdir, 'pkg/slaves/firmware/hdl/absent.vhd')]
+    assert lIndex.lookup('pkg', aCmd='include') == []
+    assert lIndex.lookup('other', aDepFile=lTopDep)[0].depfile == lTopDep
+    with pytest.raises(ValueError):
+        lIndex.lookup(aComponent='slaves')
+
+    # Rebuilt when the missing list changes
+    lParser.missing.append(('x', 'src', 'pkg', 'nothere', lTopDep))
+    assert lParser.missingIndex is not lIndex
+    assert lParser.missingComponents == {'other': {'absent'}, 'pkg': {'nothere'}}
@@ -0,0 +1,88 @@
+from __future__ import print_function, absolute_import
+
+import pytest
+import os
+import glob
+
+from os.path import join
+
+from ipbb.depparser.Pathmaker import Pathmaker
+from ipbb.depparser.DepFileParser import DepFileParser
+from ipbb.depparser.FileSystemIndex import FileSystemIndex
+
+from .test_depparser import summary
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('aExpr', [
+    'pkg', 'pkg/', 'pkg/*', 'pkg/*/', 'pkg/nothere', 'pkg/*/firmware/hdl/*.vhd', 'pkg/*/firmware/*/common*',
+    'pkg/common/firmware/hdl/common?.vhd', 'pkg/common/firmware/hdl/[c]ommon.vhd', 'pkg/top/.*', 'pkg/top/*',
+    'pkg/*/firmware/cfg', 'pkg/*/firmware/cfg/', 'nothere/*',
+])
+@pytest.mark.parametrize('aBuild', [False, True])
+def test_glob(srcdir, aExpr, aBuild):
+    os.makedirs(join(srcdir, 'pkg/top/.hidden'))
+
+    lIndex = FileSystemIndex(srcdir)
+    if aBuild:
+        lIndex.build()
+    lExpr = join(srcdir, aExpr)
+    assert sorted(lIndex.glob(lExpr)) == sorted(glob.glob(lExpr))
+
+
+# ------------------------------------------------------------------------------
+def test_queries(srcdir):
+    lIndex = FileSystemIndex(srcdir)
+    lIndex.build()
+    # The hidden folder is not scanned by build
+    assert len(lIndex) == 15
+
+    assert lIndex.exists(join(srcdir, 'pkg/top/firmware/hdl/top.vhd'))
+    assert not lIndex.isdir(join(srcdir, 'pkg/top/firmware/hdl/top.vhd'))
+    assert lIndex.isdir(join(srcdir, 'pkg/top/firmware/hdl/'))
+    assert not lIndex.exists(join(srcdir, 'pkg/top/firmware/hdl/top.vhd/x'))
+    assert sorted(lIndex.listdir(join(srcdir, 'pkg'))) == ['common', 'slaves', 'top']
+    with pytest.raises(OSError):
+        lIndex.listdir(join(srcdir, 'nothere'))
+
+    # Changes on disk are picked up after a refresh only
+    lNew = join(srcdir, 'pkg/top/firmware/hdl/new.vhd')
+    open(lNew, 'w').close()
+    assert not lIndex.exists(lNew)
+    lIndex.refresh(join(srcdir, 'pkg/top'))
+    assert lIndex.exists(lNew)
+    assert lIndex.exists(join(srcdir, 'pkg/common'))
+
+
+# ------------------------------------------------------------------------------
+def test_dangling_symlink(srcdir):
+    lHdl = join(srcdir, 'pkg/top/firmware/hdl')
+    os.symlink(join(lHdl, 'nothere.vhd'), join(lHdl, 'dangling.vhd'))
+    os.symlink(join(lHdl, 'top.vhd'), join(lHdl, 'link.vhd'))
+
+    lIndex = FileSystemIndex(srcdir)
+    lIndexed = Pathmaker(srcdir, fsindex=lIndex)
+    lPlain = Pathmaker(srcdir)
+    for lName in ('dangling.vhd', 'link.vhd', 'top.vhd', 'nothere.vhd'):
+        lPath = join(lHdl, lName)
+        assert lIndexed.exists(lPath) == lPlain.exists(lPath) == os.path.exists(lPath)
+        assert lIndex.lexists(lPath) == os.path.lexists(lPath)
+        assert lIndex.glob(lPath) == glob.glob(lPath)
+
+    # Globs list broken symlinks, as glob.glob does
+    lExpr = join(lHdl, '*.vhd')
+    assert sorted(lIndex.glob(lExpr)) == sorted(glob.glob(lExpr))
+
+
+# ------------------------------------------------------------------------------
+def test_parse(srcdir):
+    lParser = DepFileParser('vivado', Pathmaker(srcdir))
+    lParser.parse('pkg', 'top', 'top.dep')
+
+    lIndexed = DepFileParser('vivado', Pathmaker(srcdir, fsindex=FileSystemIndex(srcdir)))
+    lIndexed.parse('pkg', 'top', 'top.dep')
+
+    assert summary(lIndexed) == summary(lParser)
+    assert lIndexed._stamps == lParser._stamps
+    assert lIndexed.missingPackages == lParser.missingPackages
+    assert lIndexed.missingComponents == lParser.missingComponents
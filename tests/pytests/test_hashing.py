@@ -0,0 +1,153 @@
+from __future__ import print_function, absolute_import
+
+import pytest
+import hashlib
+import os
+
+from ipbb.tools.hashing import HashTree, hashFile, iterHashes, walkFiles, expandPaths
+from .conftest import writeTree
+
+
+# ------------------------------------------------------------------------------
+def makeTree(aLeaves):
+    lTree = HashTree('proj')
+    for lPath, lContent in aLeaves:
+        lTree.node(*lPath).setDigest(hashlib.sha1(lContent).digest())
+    return lTree
+
+
+kLeaves = [
+    (('src', 'pkg', 'a', 'a1.vhd'), b'a1'),
+    (('src', 'pkg', 'a', 'a2.vhd'), b'a2'),
+    (('src', 'pkg', 'b', 'b.vhd'), b'b'),
+    (('addrtab', 'pkg', 'a', 'a.xml'), b'xml'),
+]
+
+
+# ------------------------------------------------------------------------------
+def test_incremental():
+    lTree = makeTree(kLeaves)
+    lDigest = lTree.digest()
+
+    # Only the ancestors of the changed leaf are recomputed
+    lTree.node('src', 'pkg', 'b', 'b.vhd').setDigest(hashlib.sha1(b'B').digest())
+    assert [(p, n._digest is None) for p, n in lTree.walk(2)] == [
+        ((), True), (('src',), True), (('src', 'pkg'), True), (('addrtab',), False), (('addrtab', 'pkg'), False)
+    ]
+    assert lTree.node('src', 'pkg', 'a')._digest is not None
+
+    lChanged = makeTree(kLeaves[:2] + [(kLeaves[2][0], b'B')] + kLeaves[3:])
+    assert lTree.digest() == lChanged.digest() != lDigest
+
+    # Order and names are part of the digest
+    assert makeTree(kLeaves[::-1]).digest() != lDigest
+    assert makeTree([(p[:-1] + ('x' + p[-1],), c) for p, c in kLeaves]).digest() != lDigest
+
+
+# ------------------------------------------------------------------------------
+def test_diff():
+    lTree = makeTree(kLeaves)
+    lOther = makeTree([(kLeaves[0][0], b'A1')] + kLeaves[1:3] + [(('src', 'pkg', 'c', 'c.vhd'), b'c')])
+
+    assert list(lTree.diff(lTree)) == []
+    assert list(lOther.diff(lTree)) == [
+        (('src', 'pkg', 'a', 'a1.vhd'), 'changed'),
+        (('src', 'pkg', 'c'), 'added'),
+        (('addrtab',), 'removed'),
+    ]
+
+    # Manifest round trip
+    lRestored = HashTree.fromDict(lTree.toDict())
+    assert lRestored.digest() == lTree.digest()
+    assert list(lOther.diff(lRestored)) == list(lOther.diff(lTree))
+
+
+# ------------------------------------------------------------------------------
+def test_domains():
+    lFolder = HashTree('proj')
+    lFolder.node('x')
+    lFile = HashTree('proj')
+    lFile.node('x').setDigest(hashlib.sha1(b'').digest())
+
+    # An empty folder is not an empty file
+    assert lFolder.node('x').digest() != lFile.node('x').digest()
+    assert lFolder.digest() != lFile.digest()
+    assert list(lFolder.diff(lFile)) == [(('x',), 'changed')]
+
+    # Nor is a folder a file holding its entries
+    lNested = makeTree([(('x', 'y'), b'y')])
+    lForged = makeTree([(('x',), b'y\0' + hashlib.sha1(b'y').digest())])
+    assert lNested.digest() != lForged.digest()
+
+    # The kind of node survives the manifest round trip
+    for lTree in (lFolder, lFile):
+        lRestored = HashTree.fromDict(lTree.toDict())
+        assert lRestored.node('x').leaf == lTree.node('x').leaf
+        assert list(lRestored.diff(lTree)) == []
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('aSize', [0, 1, 1000, 0x10000 + 7])
+@pytest.mark.parametrize('aChunkSize, aMmapThreshold', [(0x10000, None), (3, None), (0x10000, 1)])
+def test_hashfile(tmp_path, aSize, aChunkSize, aMmapThreshold):
+    lContent = os.urandom(aSize)
+    lPath = str(tmp_path / 'file.bin')
+    with open(lPath, 'wb') as f:
+        f.write(lContent)
+
+    lDigest, _, lStat, _ = hashFile(lPath, aChunkSize, hashlib.sha1, aMmapThreshold=aMmapThreshold)
+    assert lDigest == hashlib.sha1(lContent).digest()
+    assert lStat.st_size == aSize
+
+    # Not a file
+    assert hashFile(str(tmp_path))[0] == hashlib.sha1().digest()
+
+
+# ------------------------------------------------------------------------------
+def test_folders(tmp_path):
+    lDir = str(tmp_path / 'ip')
+    writeTree(lDir, {
+        'b/x.xci': 'x', 'a.v': 'a', 'b/a/y.xml': 'y', 'c/z.log': 'z', 'b.log': 'log', 'b0': 'b0',
+    })
+
+    assert walkFiles(lDir) == ['a.v', 'b/a/y.xml', 'b/x.xci', 'b.log', 'b0', 'c/z.log']
+    assert walkFiles(lDir, ['*.log', 'b/a']) == ['a.v', 'b/x.xci', 'b0']
+
+    lFile = os.path.join(lDir, 'a.v')
+    for lWorkers in (1, 4):
+        assert expandPaths([lFile, lDir, lDir], ['c'], lWorkers) == [
+            [(None, lFile)]
+        ] + [[(f, os.path.join(lDir, f)) for f in ['a.v', 'b/a/y.xml', 'b/x.xci', 'b.log', 'b0']]] * 2
+
+
+
+# ------------------------------------------------------------------------------
+def test_parallel_hashing(tmp_path):
+    import threading
+
+    lPaths = []
+    for i in range(16):
+        lPaths.append(str(tmp_path / 'f{}.bin'.format(i)))
+        with open(lPaths[-1], 'wb') as f:
+            f.write(os.urandom(0x1000 * (i + 1)))
+
+    lThreads = set()
+
+    class RecordingHash(object):
+        name = 'sha1'
+
+        def __init__(self):
+            self._hash = hashlib.sha1()
+
+        def update(self, aData):
+            lThreads.add(threading.current_thread().ident)
+            self._hash.update(aData)
+
+        def digest(self):
+            return self._hash.digest()
+
+    # File content is only hashed on the worker threads, which return digests
+    lResults = list(iterHashes(lPaths, 0x1000, RecordingHash, aWorkers=4))
+    assert threading.current_thread().ident not in lThreads
+    assert lResults == list(iterHashes(lPaths, aWorkers=1))
+    assert [d for _, d, _ in lResults] == [hashFile(p)[0] for p in lPaths]
@@ -21,3 +21,66 @@ def check_vivado_env():
 
 def test_autodetect(check_vivado_env):
     xilinx.autodetect()
+
+
+# ------------------------------------------------------------------------------
+def runBatch(aCmds, aMaxLength):
+    '''Runs the batch lines in a tclsh session, and splits their output per command'''
+    import subprocess
+
+    lScripts = [s for _, _, s in xilinx.VivadoConsole._batchScripts(aCmds, aMaxLength)]
+    assert all('\n' not in s for s in lScripts)
+    assert len(lScripts) == (1 if aMaxLength > 100 else len(aCmds))
+
+    lOut = subprocess.check_output(['tclsh'], input='\n'.join(lScripts) + '\n', universal_newlines=True)
+    return xilinx.VivadoConsole._splitBatchOutput(lOut.splitlines())
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.skipif(not xilinx.which('tclsh'), reason='tclsh not available')
+@pytest.mark.parametrize('aMaxLength', [1, 4000])
+def test_batch(aMaxLength):
+    lCmds = [
+        'set a {x [y] $z}',
+        '# comment',
+        'puts "a is {$a}"; string length $a',
+        'set b "back\\\\slash \\"quoted\\""',
+        '',
+        'if {1} {puts WARNING:\\ one; puts "CRITICAL WARNING: two"}',
+    ]
+    assert runBatch(lCmds, aMaxLength) == [
+        (['x [y] $z'], None),
+        ([], None),
+        (['a is {x [y] $z}', '8'], None),
+        (['back\\slash "quoted"'], None),
+        ([], None),
+        (['WARNING: one', 'CRITICAL WARNING: two'], None),
+    ]
+
+    # The first failing command stops the batch
+    assert runBatch(['set a 1', 'puts ERROR:\\ bad; error boom', 'set a 2'], 4000) == [
+        (['1'], None),
+        (['ERROR: bad'], ['boom']),
+    ]
+
+
+# ------------------------------------------------------------------------------
+@pytest.mark.skipif(not xilinx.which('tclsh'), reason='tclsh not available')
+def test_runinfo():
+    import subprocess
+    from ipbb.cmds.vivado import makeRunInfoQuery, parseRunInfo
+
+    # Stand-ins for the Vivado run commands
+    lMock = '\n'.join([
+        'proc get_runs {} {return {synth_1 b_synth_1 impl_1}}',
+        'proc get_property {p r} {if {$p eq "STATUS"} {return "$r is\\\\ done\\nnext"}; return "$p of $r"}',
+    ])
+    lProps = ['STATUS', 'PROGRESS']
+    lQuery = makeRunInfoQuery(lProps)
+    assert '\n' not in lQuery
+
+    lOut = subprocess.check_output(['tclsh'], input=lMock + '\n' + lQuery + '\n', universal_newlines=True)
+    lInfos = parseRunInfo(['INFO: noise'] + lOut.splitlines() + [None], lProps)
+    assert list(lInfos) == ['b_synth_1', 'impl_1', 'synth_1']
+    assert lInfos['impl_1'] == {'STATUS': 'impl_1 is\\ done\nnext', 'PROGRESS': 'PROGRESS of impl_1'}
+    assert all(list(v) == lProps for v in lInfos.values())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""Synthetic work area generator
+
+Builds an ipbb work area (src/ tree and .ipbbwork signature) of
+configurable size, for benchmarking and stress-testing the dependency
+parser:
+
+- packages x components per package, each component with a number of
+  dep files and source files;
+- components form a DAG: every component includes its children in a
+  k-ary tree (fan-out), plus random leaf components, shared by many
+  parents (fan-in);
+- a fraction of the src lines are conditional ('?cond?'), and a fraction
+  use glob expressions in place of explicit file names.
+
+The work area can also be described explicitly by a YAML file mapping
+paths, relative to src/, to file content (see a_repo.yaml).
+"""
+from __future__ import print_function, absolute_import
+
+import argparse
+import os
+import random
+
+from os.path import join, dirname, exists
+
+
+# ------------------------------------------------------------------------------
+kConditions = ['toolset == "Vivado"', 'toolset != "ISE"', 'device_family == "kintex7"']
+
+
+# ------------------------------------------------------------------------------
+class RepoSpec(object):
+    """Size and shape of a synthetic work area
+
+    Attributes:
+        packages      (int): number of packages
+        components    (int): components per package
+        depfiles      (int): dep files per component (main dep file included)
+        sources       (int): source files per component
+        fanout        (int): tree includes per component
+        shared        (int): extra includes per component, to leaf components
+        conditionals (float): fraction of src lines preceded by a condition
+        globs        (float): fraction of src lines using a glob expression
+        seed          (int): random generator seed
+    """
+
+    # --------------------------------------------------------------
+    def __init__(self, packages=4, components=25, depfiles=2, sources=8, fanout=4, shared=2, conditionals=0.2, globs=0.05, seed=0):
+        self.packages = packages
+        self.components = components
+        self.depfiles = depfiles
+        self.sources = sources
+        self.fanout = fanout
+        self.shared = shared
+        self.conditionals = conditionals
+        self.globs = globs
+        self.seed = seed
+
+    # --------------------------------------------------------------
+    @classmethod
+    def forFiles(cls, aFiles, **kwargs):
+        '''Spec of a work area with about aFiles dep and source files'''
+        lSpec = cls(**kwargs)
+        lPerComponent = lSpec.depfiles + lSpec.sources
+        lComponents = max(1, aFiles // lPerComponent)
+        lSpec.packages = max(1, min(lSpec.packages, lComponents))
+        lSpec.components = max(1, lComponents // lSpec.packages)
+        return lSpec
+
+    # --------------------------------------------------------------
+    @property
+    def files(self):
+        return self.packages * self.components * (self.depfiles + self.sources)
+
+    # --------------------------------------------------------------
+    def __str__(self):
+        return '{} packages x {} components x ({} dep files + {} sources) = {} files'.format(
+            self.packages, self.components, self.depfiles, self.sources, self.files
+        )
+
+
+# ------------------------------------------------------------------------------
+def writeFiles(aRoot, aFiles):
+    """Writes a path-to-content map of files below aRoot"""
+    for lPath, lContent in aFiles.items():
+        lPath = join(aRoot, lPath)
+        if not exists(dirname(lPath)):
+            os.makedirs(dirname(lPath))
+        with open(lPath, 'w') as f:
+            f.write(lContent)
+
+
+# ------------------------------------------------------------------------------
+def componentDepFiles(aSpec, aRandom, aIndex, aNames):
+    """Dep files of the aIndex-th component
+
+    Returns:
+        tuple: dep file names and, for each of them, the list of its lines
+    """
+    lPkg, lCmp = aNames[aIndex]
+    lCount = len(aNames)
+
+    # Tree includes guarantee all components are reachable from the top, with log(n) depth
+    lIncludes = list(range(aIndex * aSpec.fanout + 1, min(aIndex * aSpec.fanout + aSpec.fanout + 1, lCount)))
+
+    # Shared includes go from inner to leaf components only, re-including whole
+    # subtrees from many places would blow up the number of commands
+    lFirstLeaf = (lCount - 1) // aSpec.fanout + 1
+    if aIndex < lFirstLeaf < lCount:
+        lIncludes += aRandom.sample(range(lFirstLeaf, lCount), min(aSpec.shared, lCount - lFirstLeaf))
+
+    lLines = []
+    for i in sorted(set(lIncludes)):
+        lIncPkg, lIncCmp = aNames[i]
+        lLines.append('include -c {}:{}'.format(lIncPkg, lIncCmp) if lIncPkg != lPkg else 'include -c {}'.format(lIncCmp))
+
+    # Additional dep files of the component, included by the main one
+    lDepFiles = ['{}.dep'.format(lCmp)] + ['{}_{}.dep'.format(lCmp, d) for d in range(1, aSpec.depfiles)]
+    lLines += ['include {}'.format(d) for d in lDepFiles[1:]]
+    lContents = [lLines] + [[] for _ in lDepFiles[1:]]
+
+    lLib = 'lib_{}'.format(lPkg)
+    for s in range(aSpec.sources):
+        lSrc = 'src{}_{}.vhd'.format(aIndex, s)
+        lRnd = aRandom.random()
+        if lRnd < aSpec.globs:
+            lLine = 'src src{}_{}*.vhd'.format(aIndex, s)
+        elif s % 4 == 0:
+            lLine = 'src -l {} {}'.format(lLib, lSrc)
+        else:
+            lLine = 'src {}'.format(lSrc)
+
+        if aRandom.random() < aSpec.conditionals:
+            lLine = '?{}? {}'.format(aRandom.choice(kConditions), lLine)
+        lContents[s % len(lContents)].append(lLine)
+
+    lContents[0].append('addrtab -t' if aIndex == 0 else 'addrtab')
+    lContents[0].append('setup {}.tcl'.format(lCmp))
+
+    return lDepFiles, lContents
+
+
+# ------------------------------------------------------------------------------
+def generate(aRoot, aSpec):
+    """Writes a synthetic work area to aRoot
+
+    Returns:
+        tuple: (package, component, dep file) of the top-level dep file
+    """
+    lRandom = random.Random(aSpec.seed)
+    lSrcDir = join(aRoot, 'src')
+
+    lNames = [
+        ('pkg{}'.format(p), 'cmp{}'.format(c))
+        for p in range(aSpec.packages)
+        for c in range(aSpec.components)
+    ]
+
+    for i, (lPkg, lCmp) in enumerate(lNames):
+        lCmpDir = join(lSrcDir, lPkg, lCmp)
+        lDepFiles, lContents = componentDepFiles(aSpec, lRandom, i, lNames)
+
+        lFiles = {}
+        if i == 0:
+            lContents[0][:0] = ['@device_family = "kintex7"', '@device_name = "xc7k325t"', '@device_package = "ffg900"', '@device_speed = "-2"']
+        for lDep, lLines in zip(lDepFiles, lContents):
+            lFiles[join('firmware', 'cfg', lDep)] = '\n'.join(lLines) + '\n'
+        for s in range(aSpec.sources):
+            lFiles[join('firmware', 'hdl', 'src{}_{}.vhd'.format(i, s))] = '-- {}:{} source {}\n'.format(lPkg, lCmp, s)
+        lFiles[join('firmware', 'cfg', lCmp + '.tcl')] = '# {}\n'.format(lCmp)
+        lFiles[join('addr_table', lCmp + '.xml')] = '<node id="{}"/>\n'.format(lCmp)
+        writeFiles(lCmpDir, lFiles)
+
+    writeFiles(aRoot, {'.ipbbwork': ''})
+    return lNames[0] + ('{}.dep'.format(lNames[0][1]),)
+
+
+# ------------------------------------------------------------------------------
+def generateFromYaml(aRoot, aYamlPath):
+    """Writes the files listed in the 'srcs' section of a YAML description to aRoot/src"""
+    import yaml
+
+    with open(aYamlPath) as f:
+        lSrcs = yaml.safe_load(f).get('srcs', {})
+    writeFiles(join(aRoot, 'src'), {k: v for k, v in lSrcs.items() if isinstance(v, str)})
+    writeFiles(aRoot, {'.ipbbwork': ''})
+
+
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dest', help='Work area directory')
+    parser.add_argument('-y', '--yaml', default=None, help='Explicit work area description')
+    parser.add_argument('-n', '--files', type=int, default=None, help='Approximate number of files, overrides -p and -c')
+    parser.add_argument('-p', '--packages', type=int, default=4)
+    parser.add_argument('-c', '--components', type=int, default=25, help='Components per package')
+    parser.add_argument('-d', '--depfiles', type=int, default=2, help='Dep files per component')
+    parser.add_argument('-s', '--sources', type=int, default=8, help='Sources per component')
+    parser.add_argument('--fanout', type=int, default=4, help='Tree includes per component')
+    parser.add_argument('--shared', type=int, default=2, help='Additional includes per component, creating fan-in')
+    parser.add_argument('--conditionals', type=float, default=0.2, help='Fraction of conditional src lines')
+    parser.add_argument('--globs', type=float, default=0.05, help='Fraction of src lines using glob expressions')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.yaml:
+        generateFromYaml(args.dest, args.yaml)
+        return
+
+    lOptions = dict(
+        packages=args.packages, components=args.components, depfiles=args.depfiles, sources=args.sources,
+        fanout=args.fanout, shared=args.shared, conditionals=args.conditionals, globs=args.globs, seed=args.seed
+    )
+    lSpec = RepoSpec.forFiles(args.files, **lOptions) if args.files else RepoSpec(**lOptions)
+    lTop = generate(args.dest, lSpec)
+    print(lSpec)
+    print('top: {}:{} {}'.format(*lTop))
+
+
+if __name__ == '__main__':
+    main()